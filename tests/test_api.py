@@ -1,6 +1,7 @@
+import asyncio
 import pytest
-from unittest.mock import patch, MagicMock
-from zor.api import generate_with_context, exponential_backoff, RateLimitError
+from unittest.mock import patch, MagicMock, AsyncMock
+from zor.api import generate_with_context, generate_with_context_async, exponential_backoff, RateLimitError, StreamInterruptedError
 
 def test_exponential_backoff_decorator():
     # Test the decorator retries on rate limit errors
@@ -13,7 +14,7 @@ def test_exponential_backoff_decorator():
     assert result == "success"
     assert mock_func.call_count == 2
 
-@patch("zor.api.genai.GenerativeModel")
+@patch("google.generativeai.GenerativeModel")
 @patch("zor.api.load_config")
 def test_generate_with_context(mock_load_config, mock_genai_model):
     # Setup
@@ -32,3 +33,96 @@ def test_generate_with_context(mock_load_config, mock_genai_model):
     assert result == "Generated response"
     mock_genai_model.assert_called_once_with("test-model", generation_config={"temperature": 0.5})
     mock_model_instance.generate_content.assert_called_once()
+
+@patch("google.generativeai.GenerativeModel")
+@patch("zor.api.load_config")
+def test_generate_with_context_streaming(mock_load_config, mock_genai_model):
+    mock_load_config.return_value = {"model": "test-model", "temperature": 0.5}
+    mock_model_instance = MagicMock()
+    mock_genai_model.return_value = mock_model_instance
+    mock_model_instance.generate_content.return_value = [
+        MagicMock(text="Generated "), MagicMock(text="response")
+    ]
+    
+    received = []
+    with patch("zor.history.save_history_item"):
+        result = generate_with_context("Test prompt", {}, on_chunk=received.append)
+    
+    assert received == ["Generated ", "response"]
+    assert result == "Generated response"
+
+@patch("google.generativeai.GenerativeModel")
+@patch("zor.api.load_config")
+def test_generate_with_context_streaming_not_retried_after_output(mock_load_config, mock_genai_model):
+    mock_load_config.return_value = {"model": "test-model", "temperature": 0.5}
+    mock_model_instance = MagicMock()
+    mock_genai_model.return_value = mock_model_instance
+    
+    def interrupted_stream():
+        yield MagicMock(text="Generated ")
+        raise Exception("quota exceeded")
+    mock_model_instance.generate_content.return_value = interrupted_stream()
+    
+    received = []
+    with pytest.raises(StreamInterruptedError):
+        generate_with_context("Test prompt", {}, on_chunk=received.append)
+    
+    # The part already shown is never streamed a second time
+    assert received == ["Generated "]
+    mock_model_instance.generate_content.assert_called_once()
+    assert mock_model_instance.generate_content.call_args.kwargs == {"stream": True}
+
+@patch("google.generativeai.GenerativeModel")
+@patch("zor.api.load_config")
+def test_generate_with_context_uses_response_cache(mock_load_config, mock_genai_model, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    mock_load_config.return_value = {"model": "test-model", "temperature": 0.5}
+    mock_model_instance = MagicMock()
+    mock_genai_model.return_value = mock_model_instance
+    mock_model_instance.generate_content.return_value = MagicMock(text="Generated response")
+    
+    with patch("zor.history.save_history_item"):
+        first = generate_with_context("Test prompt", {"file.py": "content"}, use_cache=True)
+        second = generate_with_context("Test prompt", {"file.py": "content"}, use_cache=True)
+        # A changed context is a different request
+        generate_with_context("Test prompt", {"file.py": "changed"}, use_cache=True)
+    
+    assert first == second == "Generated response"
+    assert mock_model_instance.generate_content.call_count == 2
+    assert (tmp_path / ".zor_cache" / ".gitignore").exists()
+
+@patch("google.generativeai.GenerativeModel")
+@patch("zor.api.load_config")
+def test_generate_with_context_unusable_response_cache(mock_load_config, mock_genai_model, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # A file where the cache directory should be makes every cache access fail
+    (tmp_path / ".zor_cache").write_text("")
+    mock_load_config.return_value = {"model": "test-model", "temperature": 0.5}
+    mock_model_instance = MagicMock()
+    mock_genai_model.return_value = mock_model_instance
+    mock_model_instance.generate_content.return_value = MagicMock(text="Generated response")
+    
+    with patch("zor.history.save_history_item"):
+        result = generate_with_context("Test prompt", {"file.py": "content"}, use_cache=True)
+    
+    assert result == "Generated response"
+
+@patch("google.generativeai.GenerativeModel")
+@patch("zor.api.load_config")
+def test_generate_with_context_async(mock_load_config, mock_genai_model):
+    mock_load_config.return_value = {"model": "test-model", "temperature": 0.5, "rate_limit_retries": 2}
+    mock_model_instance = MagicMock()
+    mock_genai_model.return_value = mock_model_instance
+    
+    mock_response = MagicMock()
+    mock_response.text = "Generated response"
+    # The first attempt is rate limited and retried
+    mock_model_instance.generate_content_async = AsyncMock(side_effect=[Exception("quota exceeded"), mock_response])
+    
+    with patch("asyncio.sleep", new=AsyncMock()) as mock_sleep:
+        with patch("zor.api.typer.echo"):
+            result = asyncio.run(generate_with_context_async("Test prompt", {"file.py": "file content"}))
+    
+    assert result == "Generated response"
+    assert mock_model_instance.generate_content_async.call_count == 2
+    mock_sleep.assert_awaited_once()
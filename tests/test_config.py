@@ -73,3 +73,19 @@ def test_save_config():
             assert result is True
             mock_parent.mkdir.assert_called_once_with(parents=True, exist_ok=True)
             mock_file.assert_called_once_with(mock_path_instance, "w")
+
+def test_load_config_cached_until_file_changes(tmp_path):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps({**DEFAULT_CONFIG, "model": "first-model"}))
+    
+    with patch("zor.config.get_config_path", return_value=config_path):
+        assert load_config()["model"] == "first-model"
+        
+        # Unchanged file is served from the cache without reparsing
+        with patch("zor.config.json.load") as mock_json_load:
+            assert load_config()["model"] == "first-model"
+            mock_json_load.assert_not_called()
+        
+        # Saving invalidates the cache
+        save_config({**DEFAULT_CONFIG, "model": "second-model"})
+        assert load_config()["model"] == "second-model"
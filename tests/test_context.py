@@ -28,6 +28,8 @@ def test_is_binary_file_with_binary():
 def test_should_exclude_directory():
     assert context.should_exclude_directory("exclude_this_dir", ["exclude_this_dir", ".*"]) is True
     assert context.should_exclude_directory("keep_dir", ["exclude_this_dir", ".*"]) is False
+    # zor's cache is skipped even when exclude_dirs doesn't cover it
+    assert context.should_exclude_directory(".zor_cache", ["node_modules"]) is True
 
 def test_should_exclude_file_by_name():
     assert context.should_exclude_file("test/excluded_file.py", ["excluded_file.py"], []) is True
@@ -59,3 +61,23 @@ def test_get_codebase_context_basic():
             assert "excluded_file.py" not in result
             assert "binary_file.exe" not in result
 
+
+def test_get_context_fingerprint_changes_with_files():
+    with tempfile.TemporaryDirectory() as tempdir:
+        file_path = os.path.join(tempdir, "main.py")
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write("print('hello')")
+        
+        with patch('zor.context.load_config', return_value=mock_config):
+            first = context.get_context_fingerprint(tempdir)
+            assert context.get_context_fingerprint(tempdir) == first
+            
+            # Files in excluded directories don't affect the fingerprint
+            os.mkdir(os.path.join(tempdir, "exclude_this_dir"))
+            with open(os.path.join(tempdir, "exclude_this_dir", "other.py"), "w", encoding="utf-8") as f:
+                f.write("x = 1")
+            assert context.get_context_fingerprint(tempdir) == first
+            
+            with open(file_path, "a", encoding="utf-8") as f:
+                f.write("\nprint('changed')")
+            assert context.get_context_fingerprint(tempdir) != first
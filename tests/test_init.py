@@ -1,5 +1,6 @@
 import unittest
 import re
+from zor.main import _parse_plan_sections, _clean_setup_command, _project_arg_index
 
 class TestRegexPatterns(unittest.TestCase):
     
@@ -78,5 +79,68 @@ setup(
         self.assertEqual(file_matches[0][0], "README.md")
         self.assertEqual(file_matches[1][0], "setup.py")
 
+    def test_parse_plan_sections(self):
+        """Test that every plan section is extracted in a single pass"""
+        plan_response = """PROJECT_TYPE: React Web Application
+
+MAIN_TECHNOLOGIES: React, Vite
+
+SCAFFOLD_COMMAND:
+npm create vite@latest my-app
+
+DEPENDENCIES:
+- react-router-dom: ^6.0.0
+- axios
+
+SETUP_COMMANDS:
+npm install
+NOTES: this line starts a new section"""
+        
+        project_info = _parse_plan_sections(plan_response)
+        
+        self.assertEqual(project_info["project_type"], "React Web Application")
+        self.assertEqual(project_info["main_technologies"], "React, Vite")
+        self.assertEqual(project_info["scaffold_command"], "npm create vite@latest my-app")
+        self.assertEqual(project_info["dependencies"], "- react-router-dom: ^6.0.0\n- axios")
+        self.assertEqual(project_info["setup_commands"], "npm install")
+        self.assertEqual(project_info["architecture"], "Not specified")
+
+    def test_parse_plan_sections_markdown_headers(self):
+        """Test that headers wrapped in markdown are still recognised"""
+        plan_response = """**PROJECT_TYPE:** React Web Application
+
+## SCAFFOLD_COMMAND:
+npm create vite@latest my-app
+
+**SCAFFOLD_TYPE**: CREATES_OWN_DIR
+
+3. SETUP_COMMANDS:
+* npm install"""
+        
+        project_info = _parse_plan_sections(plan_response)
+        
+        self.assertEqual(project_info["project_type"], "React Web Application")
+        self.assertEqual(project_info["scaffold_command"], "npm create vite@latest my-app")
+        self.assertEqual(project_info["scaffold_type"], "CREATES_OWN_DIR")
+        self.assertEqual(project_info["setup_commands"], "* npm install")
+
+    def test_clean_setup_command(self):
+        """Test that list markup around setup commands is removed"""
+        self.assertEqual(_clean_setup_command("1. npm install"), "npm install")
+        self.assertEqual(_clean_setup_command("- `pip install -r requirements.txt`"), "pip install -r requirements.txt")
+        self.assertEqual(_clean_setup_command("npm run build (creates the dist folder)"), "npm run build")
+        self.assertEqual(_clean_setup_command("echo $(pwd)"), "echo $(pwd)")
+        self.assertEqual(_clean_setup_command("echo `date`"), "echo `date`")
+        self.assertEqual(_clean_setup_command("```bash"), "")
+        self.assertEqual(_clean_setup_command("```"), "")
+        self.assertEqual(_clean_setup_command("cd $(git rev-parse --show-toplevel)"), "cd $(git rev-parse --show-toplevel)")
+        self.assertEqual(_clean_setup_command("   "), "")
+
+    def test_project_arg_index(self):
+        """Test that the project name argument of a scaffold command is found"""
+        self.assertEqual(_project_arg_index(["npx", "--yes", "create-react-app", "my-app"]), 2)
+        self.assertEqual(_project_arg_index(["django-admin", "startproject", "mysite"]), 1)
+        self.assertIsNone(_project_arg_index(["npm", "--yes", "--template=react"]))
+
 if __name__ == '__main__':
     unittest.main()
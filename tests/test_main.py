@@ -1,8 +1,11 @@
+import asyncio
+import os
+import sys
 import pytest
 from unittest.mock import patch, MagicMock, mock_open
 import typer
 from typer.testing import CliRunner
-from zor.main import app, load_api_key, require_api_key, ask, edit, commit, config
+from zor.main import generate_test, _stream_command, interactive, _echo_chunk, _load_context_snapshot, refactor, app, load_api_key, require_api_key, ask, edit, commit, config, _split_command, _walk_project_paths, _find_scaffolded_dir, _run_install_commands, _report_install, _fast_empty_dir, _move_scaffolded_files, _run_streamed, _batch_setup_commands, _find_project_sentinels, _read_package_json, _write_package_json, _sample_context, _glob_to_regex, _sentinel_run_command
 
 runner = CliRunner()
 
@@ -19,6 +22,8 @@ def test_load_api_key_from_env():
                 
                 assert result is True
                 mock_configure.assert_called_once_with(api_key="test-api-key")
+                # No request is made just to load the key
+                mock_model.generate_content.assert_not_called()
 
 def test_require_api_key_decorator():
     # Test function to decorate
@@ -35,27 +40,53 @@ def test_require_api_key_decorator():
     
     # Test when API key is invalid
     with patch("zor.main.api_key_valid", False):
-        with pytest.raises(typer.Exit):
-            decorated_func()
+        with patch("zor.main._check_api_key", return_value=False):
+            with pytest.raises(typer.Exit):
+                decorated_func()
+    
+    # Test when the key is only loaded lazily on first use
+    with patch("zor.main.api_key_valid", False):
+        with patch("zor.main._check_api_key", return_value=True) as mock_check:
+            assert decorated_func() == "success"
+            mock_check.assert_called_once()
+
+def test_history_does_not_need_api_key():
+    with patch("zor.main.api_key_valid", False):
+        with patch("zor.main._check_api_key") as mock_check:
+            with patch("zor.history.load_history", return_value=[]):
+                result = runner.invoke(app, ["history"])
+    
+    assert result.exit_code == 0
+    assert "No history found" in result.output
+    mock_check.assert_not_called()
 
 @patch("zor.main.generate_with_context")
-@patch("zor.main.get_codebase_context")
+@patch("zor.main._cached_context")
 def test_ask_command(mock_get_context, mock_generate):
     mock_get_context.return_value = {"file.py": "content"}
-    mock_generate.return_value = "Generated response"
     
-    with patch("builtins.print") as mock_print:
+    def stream_response(prompt, context, on_chunk=None, use_cache=False):
+        for chunk in ("Generated ", "response"):
+            on_chunk(chunk)
+        return "Generated response"
+    mock_generate.side_effect = stream_response
+    
+    with patch("typer.echo") as mock_echo:
         with patch("zor.main.api_key_valid", True):
             ask("Test prompt")
             
             mock_get_context.assert_called_once()
-            mock_generate.assert_called_once_with("Test prompt", {"file.py": "content"})
-            mock_print.assert_called_once_with("Generated response")
+            mock_generate.assert_called_once_with(
+                "Test prompt", {"file.py": "content"}, on_chunk=_echo_chunk, use_cache=True
+            )
+            # Chunks are printed as they arrive
+            printed = "".join(call.args[0] for call in mock_echo.call_args_list if call.args)
+            assert printed == "Generated response"
 
 @patch("zor.main.edit_file")
 @patch("zor.main.show_diff")
 @patch("zor.main.generate_with_context")
-@patch("zor.main.get_codebase_context")
+@patch("zor.main._cached_context")
 def test_edit_command(mock_get_context, mock_generate, mock_show_diff, mock_edit_file):
     # Setup mocks
     mock_get_context.return_value = {"file.py": "content"}
@@ -63,7 +94,7 @@ def test_edit_command(mock_get_context, mock_generate, mock_show_diff, mock_edit
     mock_show_diff.return_value = True
     mock_edit_file.return_value = True
     
-    with patch("builtins.open", mock_open(read_data="original content")):
+    with patch("pathlib.Path.read_text", return_value="original content"):
         with patch("pathlib.Path.exists") as mock_exists:
             mock_exists.return_value = True
             with patch("typer.confirm") as mock_confirm:
@@ -73,7 +104,7 @@ def test_edit_command(mock_get_context, mock_generate, mock_show_diff, mock_edit
                     
                     mock_get_context.assert_called_once()
                     mock_generate.assert_called_once()
-                    mock_show_diff.assert_called_once()
+                    mock_show_diff.assert_called_once_with("original content", "new content\n", "file.py")
                     mock_edit_file.assert_called_once()
 
 @patch("zor.main.git_commit")
@@ -113,3 +144,282 @@ def test_config_command_display():
             # API key should be masked
             api_key_call = [call for call in mock_echo.call_args_list if "api_key" in call[0][0]][0]
             assert "***** (configured)" in api_key_call[0][0]
+
+def test_split_command():
+    # Plain commands take the str.split fast path
+    assert _split_command("npm install") == ("npm", "install")
+    
+    # Quoted arguments still go through shlex
+    assert _split_command('npx create-next-app app --import-alias="@"') == (
+        "npx", "create-next-app", "app", "--import-alias=@"
+    )
+
+def test_walk_project_paths(tmp_path):
+    (tmp_path / "src" / "main" / "java" / "deep").mkdir(parents=True)
+    (tmp_path / "node_modules" / "pkg").mkdir(parents=True)
+    (tmp_path / "build" / "lib").mkdir(parents=True)
+    (tmp_path / "package.json").write_text("{}")
+    
+    paths = _walk_project_paths(tmp_path, 3)
+    
+    assert "package.json" in paths
+    assert "src/main/java" in paths
+    # Entries deeper than max_depth and skipped directories are not listed
+    assert "src/main/java/deep" not in paths
+    assert "node_modules/pkg" not in paths
+    assert "build/lib" not in paths
+
+def test_glob_to_regex_stays_within_one_level():
+    assert _glob_to_regex("*/settings.py").fullmatch("mysite/settings.py")
+    assert not _glob_to_regex("*/settings.py").fullmatch("a/b/settings.py")
+    assert _glob_to_regex("*.csproj").fullmatch("Api.csproj")
+    assert not _glob_to_regex("*.csproj").fullmatch("src/Api/Api.csproj")
+
+def test_find_scaffolded_dir(tmp_path):
+    (tmp_path / "my-app").mkdir()
+    
+    # Scaffolder swapped '_' for '-'
+    assert _find_scaffolded_dir(tmp_path / "my_app", set()) == tmp_path / "my-app"
+    
+    # A directory that existed before scaffolding is left alone
+    assert _find_scaffolded_dir(tmp_path / "my_app", {"my-app"}) is None
+    
+    # Directory was created where expected
+    assert _find_scaffolded_dir(tmp_path / "my-app", set()) is None
+    
+    # Nothing resembling the project name exists
+    assert _find_scaffolded_dir(tmp_path / "other", set()) is None
+
+def test_load_context_snapshot(tmp_path):
+    _load_context_snapshot.cache_clear()
+    with patch("zor.main._CONTEXT_CACHE_DIR", tmp_path):
+        with patch("zor.main.get_codebase_context", return_value={"file.py": "content"}) as mock_get_context:
+            assert _load_context_snapshot("abc") == {"file.py": "content"}
+            assert (tmp_path / "context-abc.json").exists()
+            # The snapshot must never be staged by `git add .`
+            assert (tmp_path / ".gitignore").read_text().splitlines()[-1] == "*"
+            
+            # A later process with the same fingerprint reads the snapshot from disk
+            _load_context_snapshot.cache_clear()
+            assert _load_context_snapshot("abc") == {"file.py": "content"}
+            mock_get_context.assert_called_once()
+            
+            # A new fingerprint rebuilds the context and drops the stale snapshot
+            _load_context_snapshot("def")
+            assert mock_get_context.call_count == 2
+            assert not (tmp_path / "context-abc.json").exists()
+    _load_context_snapshot.cache_clear()
+
+@patch("zor.main.edit_file")
+@patch("zor.main.generate_with_context")
+@patch("zor.main._cached_context")
+def test_refactor_applies_all_changes(mock_get_context, mock_generate, mock_edit_file):
+    mock_get_context.return_value = {}
+    mock_generate.return_value = "FILE: a.py\n```python\nA = 1\n```\n\nFILE: b.py\n```python\nB = 2\n```"
+    # Writes run concurrently, so decide the outcome by path rather than call order
+    mock_edit_file.side_effect = lambda file_path, *args, **kwargs: file_path == "a.py"
+    
+    # Skip the detailed diff, apply the changes, don't commit
+    with patch("typer.confirm", side_effect=[False, True, False]):
+        with patch("pathlib.Path.mkdir"):
+            with patch("typer.echo") as mock_echo:
+                refactor("rename constants")
+    
+    assert mock_edit_file.call_count == 2
+    mock_edit_file.assert_any_call("a.py", "A = 1\n", backup=True, preview=False)
+    mock_edit_file.assert_any_call("b.py", "B = 2\n", backup=True, preview=False)
+    
+    # Results are reported in the original order
+    messages = [call.args[0] for call in mock_echo.call_args_list]
+    assert "Updated a.py" in messages
+    assert "Failed to update b.py" in messages
+
+@patch("zor.main.show_diff")
+@patch("zor.main.generate_with_context")
+@patch("zor.main._cached_context")
+def test_refactor_shows_diffs_in_order(mock_get_context, mock_generate, mock_show_diff, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.py").write_text("A = 0\n")
+    mock_get_context.return_value = {}
+    mock_generate.return_value = "FILE: a.py\n```python\nA = 1\n```\n\nFILE: new.py\n```python\nB = 2\n```"
+    mock_show_diff.side_effect = lambda current, new, path, console: console.print(f"{path}: {current!r} -> {new!r}")
+    
+    # Show the detailed diff, then decline to apply
+    with patch("typer.confirm", side_effect=[True, False]):
+        with patch("typer.echo") as mock_echo:
+            refactor("update constants")
+    
+    diffs = [call.args[0] for call in mock_echo.call_args_list if call.kwargs.get("nl") is False]
+    assert diffs == [
+        "a.py: 'A = 0\\n' -> 'A = 1\\n'\n",
+        "new.py: '' -> 'B = 2\\n'\n",
+    ]
+
+@patch("zor.main.generate_with_context")
+@patch("zor.main._cached_context")
+def test_interactive_passes_conversation_history(mock_get_context, mock_generate):
+    mock_get_context.return_value = {"file.py": "content"}
+    histories = []
+    
+    def answer(prompt, context, on_chunk=None):
+        histories.append(context.get("_conversation_history"))
+        return f"Answer to {prompt}"
+    mock_generate.side_effect = answer
+    
+    with patch("typer.prompt", side_effect=["first", "second", "exit"]):
+        with patch("typer.echo"):
+            interactive()
+    
+    assert histories == [None, "User: first\nAssistant: Answer to first"]
+
+def test_stream_command_passes_output_lines(tmp_path):
+    lines = []
+    command = f'"{sys.executable}" -c "print(\'one\'); print(\'two\')"'
+    returncode = asyncio.run(_stream_command(command, cwd=tmp_path, env=dict(os.environ), on_line=lines.append))
+    
+    assert returncode == 0
+    assert lines == ["one", "two"]
+
+@patch("zor.main.generate_with_context")
+@patch("zor.main._cached_context")
+def test_generate_test_saves_extracted_code(mock_get_context, mock_generate, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "module.py").write_text("def add(a, b):\n    return a + b\n")
+    mock_get_context.return_value = {}
+    mock_generate.return_value = "Here are the tests:\n```python\ndef test_add():\n    assert add(1, 2) == 3\n```"
+    
+    with patch("typer.confirm", return_value=True):
+        generate_test("module.py")
+    
+    # Only the code block is written, without the surrounding markdown
+    assert (tmp_path / "test_module.py").read_text() == "def test_add():\n    assert add(1, 2) == 3\n"
+
+def test_report_install_waits_for_background_install(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    commands = [f'"{sys.executable}" -c "pass"', f'"{sys.executable}" -c "import sys; sys.exit(1)"']
+    console = MagicMock()
+    
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(_run_install_commands, commands, tmp_path, dict(os.environ))
+        _report_install(future, console)
+    
+    messages = [call.args[0] for call in console.print.call_args_list]
+    assert messages[0] == "[green]Dependencies installed successfully[/green]"
+    assert messages[1].startswith("[bold red]Failed to install dependencies")
+
+def test_fast_empty_dir_keeps_directory(tmp_path):
+    (tmp_path / "nested" / "deeper").mkdir(parents=True)
+    (tmp_path / "nested" / "deeper" / "file.txt").write_text("x")
+    (tmp_path / "-leading-dash.txt").write_text("x")
+    (tmp_path / ".hidden").write_text("x")
+    
+    _fast_empty_dir(tmp_path)
+    
+    assert tmp_path.is_dir()
+    assert list(tmp_path.iterdir()) == []
+
+def test_move_scaffolded_files(tmp_path):
+    found_dir = tmp_path / "my_app"
+    (found_dir / "src").mkdir(parents=True)
+    (found_dir / "src" / "index.js").write_text("index")
+    (found_dir / "package.json").write_text("{}")
+    project_dir = tmp_path / "my-app"
+    project_dir.mkdir()
+    # An entry that already exists in the target is merged by copying instead of renamed
+    (project_dir / "src").mkdir()
+    (project_dir / "src" / "existing.js").write_text("existing")
+    
+    _move_scaffolded_files(found_dir, project_dir)
+    
+    assert not found_dir.exists()
+    assert (project_dir / "src" / "index.js").read_text() == "index"
+    assert (project_dir / "src" / "existing.js").read_text() == "existing"
+    assert (project_dir / "package.json").read_text() == "{}"
+
+def test_run_streamed_passes_lines_and_keeps_tail(tmp_path):
+    lines = []
+    command = f'"{sys.executable}" -c "import sys; print(\'out\'); print(\'err\', file=sys.stderr); sys.exit(3)"'
+    returncode, output = _run_streamed(command, cwd=tmp_path, env=dict(os.environ), on_line=lines.append)
+    
+    assert returncode == 3
+    assert sorted(lines) == ["err", "out"]
+    assert sorted(output.splitlines()) == ["err", "out"]
+
+def test_batch_setup_commands_groups_independent_installs():
+    commands = [
+        "python -m venv venv",
+        "npm install",
+        "pip install -r requirements.txt",
+        "npm install --save-dev jest",
+        "npm run build",
+    ]
+    
+    assert _batch_setup_commands(commands) == [
+        ["python -m venv venv"],
+        ["npm install", "pip install -r requirements.txt"],
+        ["npm install --save-dev jest"],
+        ["npm run build"],
+    ]
+
+def test_find_project_sentinels(tmp_path):
+    (tmp_path / "mysite" / "mysite").mkdir(parents=True)
+    (tmp_path / "mysite" / "manage.py").write_text("")
+    (tmp_path / "mysite" / "mysite" / "settings.py").write_text("")
+    (tmp_path / "node_modules" / "pkg").mkdir(parents=True)
+    (tmp_path / "node_modules" / "pkg" / "main.py").write_text("")
+    (tmp_path / "a" / "b" / "c" / "d").mkdir(parents=True)
+    (tmp_path / "a" / "b" / "c" / "d" / "app.py").write_text("")
+    
+    assert _find_project_sentinels(tmp_path) == {"manage.py": "mysite/manage.py"}
+    assert _find_project_sentinels(tmp_path, max_depth=5) == {
+        "manage.py": "mysite/manage.py",
+        "app.py": "a/b/c/d/app.py",
+    }
+
+def test_sentinel_run_command_priority():
+    assert _sentinel_run_command({"manage.py": "mysite/manage.py", "app.py": "app.py"}) == "python mysite/manage.py runserver"
+    assert _sentinel_run_command({"app.py": "app.py", "main.py": "main.py"}) == "flask run"
+    assert _sentinel_run_command({"app.py": "api/app.py"}) == "flask --app api/app.py run"
+    assert _sentinel_run_command({"main.py": "src/main.py"}) == "python src/main.py"
+    assert _sentinel_run_command({}) is None
+
+def test_find_project_sentinels_ignores_case(tmp_path):
+    (tmp_path / "App.py").write_text("")
+    
+    assert _find_project_sentinels(tmp_path) == {"app.py": "App.py"}
+
+def test_find_project_sentinels_prefers_shallowest(tmp_path):
+    for relative in ("a/b/app.py", "z/app.py", "a/b/main.py", "main.py"):
+        (tmp_path / relative).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / relative).write_text("")
+    
+    assert _find_project_sentinels(tmp_path) == {"app.py": "z/app.py", "main.py": "main.py"}
+
+def test_read_package_json_reuses_unchanged_parse(tmp_path):
+    package_json_path = tmp_path / "package.json"
+    package_json_path.write_text('{"scripts": {"start": "node app.js"}}')
+    
+    data = _read_package_json(package_json_path)
+    assert _read_package_json(package_json_path) is data
+    
+    data["dependencies"] = {"express": "latest"}
+    _write_package_json(package_json_path, data)
+    assert _read_package_json(package_json_path) is data
+    
+    # Changed on disk by something else, so it is parsed again
+    package_json_path.write_text('{"scripts": {"dev": "vite", "build": "vite build"}}')
+    assert _read_package_json(package_json_path) == {"scripts": {"dev": "vite", "build": "vite build"}}
+
+def test_sample_context_fits_budget_across_extensions():
+    context = {
+        "big.py": "x" * 60,
+        "small.py": "x" * 10,
+        "app.js": "x" * 30,
+        "huge.js": "x" * 200,
+    }
+    
+    sampled = _sample_context(context, 100)
+    
+    # Largest first, alternating between extensions; huge.js never fits
+    assert sampled == {"app.js": context["app.js"], "big.py": context["big.py"], "small.py": context["small.py"]}
+    assert sum(len(content) for content in sampled.values()) <= 100
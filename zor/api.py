@@ -1,17 +1,59 @@
+import inspect
 import time
 import random
 from functools import wraps
+from typing import Callable, Optional
 import typer
-import google.generativeai as genai
 from .config import load_config
 
 class RateLimitError(Exception):
     """Exception raised when API rate limit is hit"""
     pass
 
+class StreamInterruptedError(Exception):
+    """Exception raised when a streamed response fails after part of it was shown; never retried"""
+    pass
+
+def _retry_delay(error: Exception, attempt: int, max_attempts: int) -> Optional[float]:
+    """Seconds to wait before retrying after a rate limit error, or None to re-raise"""
+    # A retry would stream the whole answer again after the part already shown
+    if isinstance(error, StreamInterruptedError):
+        return None
+    
+    # Check if it looks like a rate limit error
+    error_str = str(error).lower()
+    is_rate_limit = any(term in error_str for term in 
+                       ["rate limit", "quota", "too many requests"])
+    
+    if is_rate_limit and attempt < max_attempts - 1:
+        # Calculate backoff with jitter
+        backoff_time = (2 ** attempt) + random.uniform(0, 1)
+        typer.echo(f"Rate limit hit. Retrying in {backoff_time:.1f}s...")
+        return backoff_time
+    return None
+
 def exponential_backoff(max_retries=3):
-    """Decorator for exponential backoff on rate limiting"""
+    """Decorator for exponential backoff on rate limiting, for plain and async functions"""
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                import asyncio
+                
+                config = load_config()
+                max_attempts = config.get("rate_limit_retries", max_retries)
+                
+                for attempt in range(max_attempts):
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        backoff_time = _retry_delay(e, attempt, max_attempts)
+                        if backoff_time is None:
+                            raise
+                        # Sleep without blocking other requests running on the event loop
+                        await asyncio.sleep(backoff_time)
+            return async_wrapper
+        
         @wraps(func)
         def wrapper(*args, **kwargs):
             config = load_config()
@@ -21,44 +63,100 @@ def exponential_backoff(max_retries=3):
                 try:
                     return func(*args, **kwargs)
                 except Exception as e:
-                    # Check if it looks like a rate limit error
-                    error_str = str(e).lower()
-                    is_rate_limit = any(term in error_str for term in 
-                                       ["rate limit", "quota", "too many requests"])
-                    
-                    if is_rate_limit and attempt < max_attempts - 1:
-                        # Calculate backoff with jitter
-                        backoff_time = (2 ** attempt) + random.uniform(0, 1)
-                        typer.echo(f"Rate limit hit. Retrying in {backoff_time:.1f}s...")
-                        time.sleep(backoff_time)
-                        continue
-                    else:
+                    backoff_time = _retry_delay(e, attempt, max_attempts)
+                    if backoff_time is None:
                         # Re-raise the exception
                         raise
+                    time.sleep(backoff_time)
         return wrapper
     return decorator
 
+def _build_full_prompt(prompt: str, context: dict) -> str:
+    """Combine the codebase context and the user prompt into the text sent to the model"""
+    context_str = "\n".join(f"File: {path}\n{content}" for path, content in context.items())
+    return f"Codebase Context:\n{context_str}\n\nUser Prompt: {prompt}"
+
+def _record_history(prompt: str, response_text: str):
+    """Save a prompt and its response to history"""
+    try:
+        from .history import save_history_item
+        save_history_item(prompt, response_text)
+    except ImportError:
+        pass
+
 @exponential_backoff()
-def generate_with_context(prompt: str, context: dict):
-    """Generate a response with codebase context with rate limiting"""
+def generate_with_context(prompt: str, context: dict, on_chunk: Optional[Callable[[str], None]] = None,
+                          use_cache: bool = False):
+    """Generate a response with codebase context with rate limiting
+
+    If on_chunk is given, the response is streamed and each piece of text is passed
+    to it as soon as it arrives. The full text is returned either way.
+    If use_cache is set, an identical earlier request is answered from the response cache.
+    """
     config = load_config()
     model_name = config.get("model", "gemini-2.0-flash")
     temperature = config.get("temperature", 0.2)
     
-    model = genai.GenerativeModel(model_name, 
-                                 generation_config={"temperature": temperature})
+    full_prompt = _build_full_prompt(prompt, context)
     
-    context_str = "\n".join(f"File: {path}\n{content}" for path, content in context.items())
-    full_prompt = f"Codebase Context:\n{context_str}\n\nUser Prompt: {prompt}"
+    response_text = None
+    if use_cache:
+        from .llm_cache import make_cache_key, load_cached_response
+        cache_key = make_cache_key(model_name, temperature, full_prompt)
+        response_text = load_cached_response(cache_key)
+        if response_text is not None and on_chunk is not None:
+            on_chunk(response_text)
     
-    response = model.generate_content(full_prompt)
+    if response_text is None:
+        # Imported here since the SDK takes most of the CLI's startup time
+        import google.generativeai as genai
+        
+        model = genai.GenerativeModel(model_name, 
+                                     generation_config={"temperature": temperature})
+        
+        if on_chunk is None:
+            response_text = model.generate_content(full_prompt).text
+        else:
+            chunks = []
+            try:
+                for chunk in model.generate_content(full_prompt, stream=True):
+                    chunks.append(chunk.text)
+                    on_chunk(chunk.text)
+            except Exception as e:
+                # Only a stream that showed nothing yet can safely be retried from the start
+                if chunks:
+                    raise StreamInterruptedError(f"Response interrupted after partial output: {e}") from e
+                raise
+            response_text = "".join(chunks)
+        
+        if use_cache:
+            from .llm_cache import save_cached_response
+            try:
+                save_cached_response(cache_key, response_text)
+            except OSError:
+                pass
     
     # Save to history
-    try:
-        from .history import save_history_item
-        save_history_item(prompt, response.text)
-    except ImportError:
-        pass
+    _record_history(prompt, response_text)
+    
+    return response_text
+
+@exponential_backoff()
+async def generate_with_context_async(prompt: str, context: dict):
+    """Async version of generate_with_context, so independent requests can run concurrently"""
+    config = load_config()
+    model_name = config.get("model", "gemini-2.0-flash")
+    temperature = config.get("temperature", 0.2)
+    
+    import google.generativeai as genai
+    
+    model = genai.GenerativeModel(model_name, 
+                                 generation_config={"temperature": temperature})
+    response = await model.generate_content_async(_build_full_prompt(prompt, context))
+    
+    # Save to history
+    _record_history(prompt, response.text)
     
     return response.text
 
+
@@ -15,8 +15,20 @@ DEFAULT_CONFIG = {
     "backup_files": True,
     "history_size": 10,
     "rate_limit_retries": 3,
+    "review_max_context_chars": 1_000_000,
 }
 
+# Caches zor keeps in the project, relative to the directory it runs in
+CACHE_DIR = Path(".zor_cache")
+
+def ensure_cache_dir(cache_dir=CACHE_DIR):
+    """Create a cache directory that git ignores, so `git add .` never stages cached data"""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    gitignore = cache_dir / ".gitignore"
+    if not gitignore.exists():
+        gitignore.write_text("# Created by zor automatically.\n*\n", encoding="utf-8")
+    return cache_dir
+
 def get_config_path():
     """Get path to config file, prioritizing local then global config"""
     # Check for project-specific config
@@ -29,6 +41,17 @@ def get_config_path():
     global_config = home_dir / ".config" / "zor" / "config.json"
     return global_config
 
+# Parsed config per path, with the (mtime, size) it was read at
+_config_cache = {}
+
+def _config_signature(config_path):
+    """Return (mtime_ns, size) of the config file, or None if it can't be stat'ed"""
+    try:
+        stat = config_path.stat()
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
 def load_config():
     """Load configuration from file or create default if not exists"""
     config_path = get_config_path()
@@ -44,6 +67,12 @@ def load_config():
         
         return DEFAULT_CONFIG
     
+    # Reuse the parsed config while the file is unchanged
+    signature = _config_signature(config_path)
+    cached = _config_cache.get(config_path)
+    if signature is not None and cached is not None and cached[0] == signature:
+        return dict(cached[1])
+    
     # Load existing config
     try:
         with open(config_path, "r") as f:
@@ -60,8 +89,13 @@ def load_config():
         if updated:
             with open(config_path, "w") as f:
                 json.dump(config, f, indent=2)
+            signature = _config_signature(config_path)
         
-        return config
+        if signature is not None:
+            _config_cache[config_path] = (signature, config)
+        
+        # Callers may modify the result, so never hand out the cached dict itself
+        return dict(config)
     except Exception as e:
         typer.echo(f"Error loading config: {e}. Using defaults.", err=True)
         return DEFAULT_CONFIG
@@ -74,4 +108,7 @@ def save_config(config):
     with open(config_path, "w") as f:
         json.dump(config, f, indent=2)
     
+    # Don't rely on the mtime alone to notice our own write
+    _config_cache.pop(config_path, None)
+    
     return True
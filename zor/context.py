@@ -1,8 +1,10 @@
 import os
+import json
+import hashlib
 import mimetypes
 from pathlib import Path
 import fnmatch
-from .config import load_config
+from .config import load_config, DEFAULT_CONFIG, CACHE_DIR
 
 def is_binary_file(file_path):
     """Check if a file is binary by reading a small sample"""
@@ -25,6 +27,9 @@ def is_binary_file(file_path):
 
 def should_exclude_directory(dir_name, exclude_dirs):
     """Check if a directory should be excluded"""
+    # zor's own cache is never part of the codebase, whatever exclude_dirs says
+    if dir_name == CACHE_DIR.name:
+        return True
     for pattern in exclude_dirs:
         if fnmatch.fnmatch(dir_name, pattern):
             return True
@@ -126,3 +131,39 @@ def get_codebase_context(project_root="."):
     print(f"Added {len(context)} files to context")
     
     return context
+
+def get_context_fingerprint(project_root="."):
+    """Hash the path, size and mtime of every file under project_root to detect changes without reading them"""
+    config = load_config()
+    exclude_dirs = config.get("exclude_dirs", DEFAULT_CONFIG["exclude_dirs"])
+    
+    # Exclusion settings change what goes into the context, so they are part of the fingerprint
+    digest = hashlib.sha256()
+    digest.update(json.dumps([
+        config.get(key) for key in ("exclude_dirs", "exclude_files", "exclude_extensions")
+    ]).encode("utf-8"))
+    
+    entries = []
+    pending = [project_root]
+    while pending:
+        current = pending.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not should_exclude_directory(entry.name, exclude_dirs):
+                                pending.append(entry.path)
+                        else:
+                            stat = entry.stat()
+                            relative_path = os.path.relpath(entry.path, project_root)
+                            entries.append((relative_path, stat.st_mtime_ns, stat.st_size))
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    
+    for entry in sorted(entries):
+        digest.update(repr(entry).encode("utf-8"))
+    
+    return digest.hexdigest()
@@ -2,13 +2,14 @@ import typer
 from typing import Optional
 from pathlib import Path
 
-def show_diff(original_content: str, new_content: str, file_path: str):
-    """Show diff between original and new content"""
+def show_diff(original_content: str, new_content: str, file_path: str, console=None):
+    """Show diff between original and new content, optionally on a given rich Console"""
     import difflib
     from rich.console import Console
     from rich.syntax import Syntax
     
-    console = Console()
+    if console is None:
+        console = Console()
     
     # Get the diff
     diff = difflib.unified_diff(
@@ -0,0 +1,55 @@
+import hashlib
+import os
+from typing import Optional
+from .config import CACHE_DIR, ensure_cache_dir
+
+# Keep at most this many cached responses, evicting the least recently used
+MAX_CACHED_RESPONSES = 256
+
+# Cached responses, inside zor's git-ignored cache directory
+LLM_CACHE_DIR = CACHE_DIR / "llm"
+
+def get_cache_dir():
+    """Get path to the response cache directory, creating it if needed"""
+    ensure_cache_dir()
+    LLM_CACHE_DIR.mkdir(exist_ok=True)
+    return LLM_CACHE_DIR
+
+def make_cache_key(model_name: str, temperature: float, full_prompt: str) -> str:
+    """Build a cache key from everything that determines the model's response"""
+    digest = hashlib.sha256()
+    for part in (model_name, str(temperature), full_prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:32]
+
+def load_cached_response(key: str) -> Optional[str]:
+    """Load a cached response, or None if there is none or the cache can't be read"""
+    # Lookups never create the cache directory; a missing or unusable one is just a miss
+    cache_path = LLM_CACHE_DIR / f"{key}.txt"
+    try:
+        response = cache_path.read_text(encoding="utf-8")
+    except (OSError, UnicodeDecodeError):
+        return None
+
+    # Mark as recently used so eviction keeps it
+    try:
+        os.utime(cache_path)
+    except OSError:
+        pass
+    return response
+
+def save_cached_response(key: str, response: str):
+    """Save a response to the cache, evicting the oldest entries beyond the limit"""
+    cache_dir = get_cache_dir()
+    (cache_dir / f"{key}.txt").write_text(response, encoding="utf-8")
+
+    try:
+        entries = list(cache_dir.glob("*.txt"))
+        if len(entries) > MAX_CACHED_RESPONSES:
+            entries.sort(key=lambda path: path.stat().st_mtime_ns)
+            for stale_path in entries[:len(entries) - MAX_CACHED_RESPONSES]:
+                stale_path.unlink()
+    except OSError:
+        # Another process may be evicting at the same time; the next save will retry
+        pass
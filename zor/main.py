@@ -1,43 +1,622 @@
 import os
+import sys
 import typer
 from dotenv import load_dotenv
-import google.generativeai as genai
 from pathlib import Path
-from .context import get_codebase_context
+from .context import get_codebase_context, get_context_fingerprint
 from .file_ops import edit_file, show_diff
 from .git_utils import git_commit
-from .api import generate_with_context
-from .config import load_config, save_config
+from .api import generate_with_context, generate_with_context_async
+from .config import load_config, DEFAULT_CONFIG, save_config, CACHE_DIR, ensure_cache_dir
 from typing import Optional, Annotated, Callable, List
-from functools import wraps
+from functools import wraps, lru_cache, partial
 from typer.core import TyperGroup
-from rich.console import Console
-from rich.panel import Panel
-import subprocess
-import shutil
+import shlex
+import re
+import fnmatch
+import json
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import ChainMap, deque
+
+# Parse JSON files such as package.json with orjson when it is installed
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
 
 app = typer.Typer()
 
-load_dotenv()
+# Parsed package.json files: path -> ((mtime_ns, size), data)
+_package_json_cache = {}
+
+def _file_signature(path):
+    """Return (mtime_ns, size) of a file"""
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _read_package_json(path):
+    """Parse a package.json, reusing the last parse while the file is unchanged.
+
+    The returned dict is shared with the cache, so changes to it must be saved with _write_package_json.
+    """
+    path = os.fspath(path)
+    signature = _file_signature(path)
+    cached = _package_json_cache.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    
+    with open(path, "rb") as f:
+        data = _json_loads(f.read())
+    _package_json_cache[path] = (signature, data)
+    return data
+
+def _write_package_json(path, data):
+    """Save a package.json and remember it as the latest parse"""
+    path = os.fspath(path)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+    _package_json_cache[path] = (_file_signature(path), data)
+
+# Commands go through the shell on Windows, where many tools (npm, npx, ...) are .cmd shims
+_IS_WIN = sys.platform == "win32"
+
+# Whether .env has been loaded into the environment for this process
+_dotenv_loaded = False
+
+def _load_dotenv_once():
+    """Load .env into the environment the first time it is needed"""
+    global _dotenv_loaded
+    if not _dotenv_loaded:
+        load_dotenv()
+        _dotenv_loaded = True
+
+# Shared --no-cache flag for commands that reuse cached responses to identical requests
+NoCacheOption = Annotated[
+    bool, typer.Option("--no-cache", help="Always query the model instead of reusing a cached response")
+]
+
+# Characters that need shlex's quoting/escaping rules to tokenize correctly
+_SHELL_METACHARS = frozenset("\"'\\$`*?[]{}<>|&;()")
+
+@lru_cache(maxsize=256)
+def _split_command(command):
+    """Split a command into arguments, skipping shlex for plain whitespace-separated commands"""
+    if _SHELL_METACHARS.isdisjoint(command):
+        return tuple(command.split())
+    return tuple(shlex.split(command))
+
+# Fenced code blocks in model responses
+_CODE_BLOCK_RE = re.compile(r"```(?:\w+)?\n(.*?)```", re.DOTALL)
+
+# "FILE: path" followed by a fenced block, as requested by `refactor` and `init`
+_FILE_BLOCK_RE = re.compile(r"FILE: (.+?)\n```(?:\w+)?\n(.+?)```", re.DOTALL)
+
+_ENV_KEY_RE = re.compile(r"GEMINI_API_KEY=.*")
+
+# Separators between a dependency's name and version in the plan, e.g. "react-router-dom: ^6.0.0"
+_DEPENDENCY_SPLIT_RE = re.compile(r"[:,\s]\s*")
+
+# Third-party module imports in generated JS/TS files
+_JS_IMPORT_RES = (
+    re.compile(r'import\s+.*?\s+from\s+[\'"]([^.][^\'"]*)[\'"]\s*;?'),  # ES6 imports
+    re.compile(r'require\s*\(\s*[\'"]([^.][^\'"]*)[\'"]\s*\)'),  # CommonJS imports
+    re.compile(r'@import\s+[\'"]([^.][^\'"]*)[\'"]\s*;?'),      # CSS imports
+)
+
+# List markup the model puts around setup commands: "1. ", "- " or "* " prefixes and trailing "(notes)"
+_NUMBERED_RE = re.compile(r"^(?:\d+\.|[-*])\s+")
+# Inline-code backticks, only when they wrap the whole command so `...` substitutions survive
+_BACKTICKED_RE = re.compile(r"^`(.*)`$")
+# A trailing parenthesized note, but never a $(...) command substitution
+_PARENS_RE = re.compile(r"(?<!\$)\s+\([^)$]*\)$")
+
+# {project_name} / {project_dir} placeholders in the plan's scaffold command
+_PLACEHOLDER_RE = re.compile(r"\{(project_name|project_dir)\}")
+
+def _clean_setup_command(line):
+    """Turn a line of the plan's SETUP_COMMANDS section into a runnable command, or "" for none"""
+    # Code fence lines ("```bash", "```") are markup, not commands
+    if line.lstrip().startswith("```"):
+        return ""
+    command = _BACKTICKED_RE.sub(r"\1", _NUMBERED_RE.sub("", line.strip(), count=1))
+    return _PARENS_RE.sub("", command).strip()
+
+def _project_arg_index(command_parts):
+    """Index of the first positional argument after the executable (usually the project name), or None"""
+    return next(
+        (i for i, part in enumerate(command_parts[1:], 1)
+         if not part.startswith("-") and "/" not in part and "=" not in part),
+        None
+    )
+
+# Sections of the `init` planning response, keyed by their lowercased header
+_PLAN_SECTIONS = (
+    "project_type", "main_technologies", "architecture", "scaffold_command",
+    "scaffold_type", "dependencies", "setup_commands", "development_recommendations",
+)
+# Headers may carry markdown the model adds, e.g. "**PROJECT_TYPE:** ...", "## SETUP_COMMANDS:" or "1. DEPENDENCIES:"
+_PLAN_HEADER_RE = re.compile(r"^[\s#*\d.]*([A-Z][A-Z_]*)\**:\**\s*(.*)$")
+
+def _parse_plan_sections(plan_response):
+    """Split the planning response into its HEADER: sections in a single pass over its lines.
+
+    A section ends at the next header or at the first blank line after its content.
+    Sections missing from the response are reported as "Not specified".
+    """
+    parsed = {}
+    current = None
+    for line in plan_response.splitlines():
+        header = _PLAN_HEADER_RE.match(line)
+        if header:
+            key = header.group(1).lower()
+            # The first occurrence of a section wins
+            if key in parsed:
+                current = None
+                continue
+            current = parsed[key] = []
+            # Drop bold markers left around the inline value
+            value = header.group(2).strip("*").strip()
+            if value:
+                current.append(value)
+        elif current is not None:
+            if line.strip():
+                current.append(line)
+            elif current:
+                current = None
+    
+    return {
+        key: "\n".join(parsed[key]).strip() if key in parsed else "Not specified"
+        for key in _PLAN_SECTIONS
+    }
+
+# Codebase context snapshots, stored relative to the directory zor runs in
+_CONTEXT_CACHE_DIR = CACHE_DIR
+
+@lru_cache(maxsize=1)
+def _load_context_snapshot(fingerprint):
+    """Load the context for a fingerprint from disk, or build and store it on a miss"""
+    cache_path = _CONTEXT_CACHE_DIR / f"context-{fingerprint}.json"
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    
+    context = get_codebase_context()
+    try:
+        ensure_cache_dir(_CONTEXT_CACHE_DIR)
+        # Only the snapshot for the current state of the codebase is worth keeping
+        for stale_path in _CONTEXT_CACHE_DIR.glob("context-*.json"):
+            stale_path.unlink()
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump(context, f)
+    except OSError:
+        pass
+    return context
+
+def _cached_context():
+    """Get the codebase context, reusing the last snapshot while no file has changed"""
+    return _load_context_snapshot(get_context_fingerprint())
+
+# Longest output line read from a streamed command (npm progress output can be very long)
+_STREAM_LINE_LIMIT = 1 << 20
+
+# Upper bound on blocking file operations run concurrently in worker threads
+_MAX_IO_CONCURRENCY = 16
+
+async def _run_in_threads(calls, limit=_MAX_IO_CONCURRENCY):
+    """Run blocking zero-argument callables in worker threads, returning results (or exceptions) in order"""
+    import asyncio
+    
+    semaphore = asyncio.Semaphore(limit)
+    
+    async def run_one(call):
+        async with semaphore:
+            return await asyncio.to_thread(call)
+    
+    return await asyncio.gather(*(run_one(call) for call in calls), return_exceptions=True)
+
+def _write_generated_file(path, content):
+    """Write generated content as UTF-8, newlines untouched, through a single large buffer"""
+    with open(path, "w", encoding="utf-8", newline="", buffering=1 << 20) as f:
+        f.write(content)
+
+def _read_existing_file(file_path):
+    """Read a file's content, or return None if it doesn't exist yet"""
+    path = Path(file_path)
+    if not path.exists():
+        return None
+    return path.read_text(encoding="utf-8")
+
+def _render_diff(current_content, new_content, file_path, like):
+    """Render a diff into a string, using the terminal settings of the console it will be printed on"""
+    from rich.console import Console
+    
+    buffer = io.StringIO()
+    show_diff(current_content, new_content, file_path, console=Console(
+        file=buffer,
+        force_terminal=like.is_terminal,
+        color_system=like.color_system,
+        width=like.width,
+    ))
+    return buffer.getvalue()
+
+async def _stream_command(command, cwd, env, use_shell=False, on_line=None):
+    """Run a command without blocking the event loop and return its exit code.
+
+    If on_line is given, stdout and stderr are captured and passed to it line by line;
+    otherwise the command inherits the terminal so it can prompt the user.
+    """
+    import asyncio
+    
+    output = asyncio.subprocess.PIPE if on_line else None
+    stderr = asyncio.subprocess.STDOUT if on_line else None
+    
+    if use_shell:
+        process = await asyncio.create_subprocess_shell(
+            command, cwd=cwd, env=env, stdout=output, stderr=stderr, limit=_STREAM_LINE_LIMIT
+        )
+    else:
+        process = await asyncio.create_subprocess_exec(
+            *_split_command(command), cwd=cwd, env=env, stdout=output, stderr=stderr,
+            limit=_STREAM_LINE_LIMIT, close_fds=False
+        )
+    
+    if on_line:
+        async for line in process.stdout:
+            on_line(line.decode("utf-8", errors="replace").rstrip("\r\n"))
+    
+    return await process.wait()
+
+async def _run_concurrently(*coroutines):
+    """Await independent coroutines together, returning each one's result (or exception) in order"""
+    import asyncio
+    
+    return await asyncio.gather(*coroutines, return_exceptions=True)
+
+# Files each framework is expected to have after `init`, as glob patterns relative to the project root
+_CRITICAL_FILE_GLOBS = {
+    "react": ["package.json", "src/App.*", "public/index.html"],
+    "vue": ["package.json", "src/App.vue", "src/main.js"],
+    "angular": ["package.json", "angular.json", "src/app"],
+    "next.js": ["package.json", "next.config.js"],
+    "express": ["package.json", "app.js"],
+    "django": ["manage.py", "*/settings.py"],
+    "flask": ["app.py", "requirements.txt"],
+    "spring": ["pom.xml", "src/main/java"],
+    "laravel": ["composer.json", "artisan"],
+    ".net": ["*.csproj", "Program.cs"],
+    "flutter": ["pubspec.yaml", "lib/main.dart"]
+}
+
+def _glob_to_regex(pattern):
+    """Compile a glob pattern the way Path.glob reads it, with * and ? never matching '/'"""
+    return re.compile("".join(
+        "[^/]*" if char == "*" else "[^/]" if char == "?" else re.escape(char) for char in pattern
+    ))
+
+# Same patterns pre-translated to regexes (matched with fullmatch) so verification is one directory walk
+_CRITICAL_FILE_PATTERNS = {
+    framework: [(pattern, _glob_to_regex(pattern)) for pattern in patterns]
+    for framework, patterns in _CRITICAL_FILE_GLOBS.items()
+}
+_CRITICAL_FILE_MAX_DEPTH = max(
+    pattern.count("/") + 1 for patterns in _CRITICAL_FILE_GLOBS.values() for pattern in patterns
+)
+
+# Lines of output kept from a streamed command for error reporting
+_OUTPUT_TAIL_LINES = 200
+
+def _run_streamed(command, cwd, env, shell=False, on_line=None, stdin=None):
+    """Run a command, passing each output line to on_line as it arrives.
+
+    Only the last lines of output are retained, so a chatty installer's log never sits in
+    memory in full. Returns the exit code and that tail. `stdin` is passed to Popen as is;
+    None leaves the command attached to the terminal.
+    """
+    import subprocess
+    
+    tail = deque(maxlen=_OUTPUT_TAIL_LINES)
+    with subprocess.Popen(
+        command if shell else list(_split_command(command)),
+        cwd=cwd,
+        shell=shell,
+        close_fds=False,
+        env=env,
+        stdin=stdin,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        errors="replace",
+        bufsize=1,
+    ) as process:
+        for line in process.stdout:
+            tail.append(line)
+            if on_line is not None:
+                on_line(line.rstrip("\n"))
+        returncode = process.wait()
+    return returncode, "".join(tail)
+
+def _run_install_commands(commands, cwd, env):
+    """Run install commands in order and return each command's exit code and output tail.
+
+    The commands run in the background while init keeps prompting, so they get no stdin
+    and cannot compete with those prompts for the user's keystrokes.
+    """
+    import subprocess
+    
+    return [_run_streamed(command, cwd, env, shell=True, stdin=subprocess.DEVNULL) for command in commands]
+
+def _report_install(install_future, console):
+    """Wait for a background install to finish and report how each command went"""
+    try:
+        with console.status("[bold green]Installing dependencies...", spinner="dots"):
+            processes = install_future.result()
+    except Exception as e:
+        console.print(f"[bold red]Error installing dependencies: {str(e)}[/bold red]")
+        return
+    
+    for returncode, output in processes:
+        if returncode == 0:
+            console.print("[green]Dependencies installed successfully[/green]")
+        else:
+            console.print(f"[bold red]Failed to install dependencies: {output}[/bold red]")
+
+def _dir_has_entries(directory):
+    """Check whether a directory has any entries, reading at most one of them"""
+    with os.scandir(directory) as entries:
+        return next(entries, None) is not None
+
+def _top_level_names(directory):
+    """Names of the entries directly inside a directory, from a single listing"""
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name for entry in entries}
+    except OSError:
+        return set()
+
+def _fast_empty_dir(directory):
+    """Remove everything inside a directory but keep the directory itself.
+
+    Deleting a big tree entry by entry from Python is slow, so a single `rm -rf` (or a robocopy
+    mirror of an empty directory on Windows) does the bulk of the work. Whatever is left behind,
+    e.g. when the tool is missing, is removed with shutil, which raises on failure.
+    """
+    import shutil
+    import subprocess
+    import tempfile
+    
+    directory = Path(directory)
+    entries = [str(directory / name) for name in os.listdir(directory)]
+    if not entries:
+        return
+    
+    try:
+        if _IS_WIN:
+            if shutil.which("robocopy"):
+                with tempfile.TemporaryDirectory() as empty_dir:
+                    subprocess.run(
+                        ["robocopy", empty_dir, str(directory), "/MIR", "/NFL", "/NDL", "/NJH", "/NJS"],
+                        capture_output=True, check=False
+                    )
+        elif shutil.which("rm"):
+            subprocess.run(["rm", "-rf", "--", *entries], capture_output=True, check=False)
+    except OSError:
+        pass
+    
+    # DirEntry caches the file type from the directory listing, so this costs no extra stat calls
+    with os.scandir(directory) as remaining:
+        for entry in remaining:
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.unlink(entry.path)
+
+def _move_scaffolded_files(found_dir, project_dir):
+    """Move everything a scaffolder created in found_dir into project_dir, then remove found_dir.
+
+    On the same filesystem each top-level entry is simply renamed into place. Entries that can't be
+    renamed (another device, or a name already taken in project_dir) are copied in parallel, since
+    trees like node_modules hold many small files. The first copy error is raised once all copies
+    have finished, leaving found_dir in place.
+    """
+    import errno
+    import shutil
+    
+    with os.scandir(found_dir) as entries:
+        entries = list(entries)
+    
+    if os.stat(found_dir).st_dev == os.stat(project_dir).st_dev:
+        to_copy = []
+        for entry in entries:
+            target = project_dir / entry.name
+            if not os.path.lexists(target):
+                try:
+                    os.replace(entry.path, target)
+                    continue
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+            to_copy.append(entry)
+        entries = to_copy
+    
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+        copies = [
+            executor.submit(shutil.copytree, entry.path, project_dir / entry.name, dirs_exist_ok=True)
+            if entry.is_dir()
+            else executor.submit(shutil.copy2, entry.path, project_dir / entry.name)
+            for entry in entries
+        ]
+    for copy in copies:
+        copy.result()
+    
+    _fast_empty_dir(found_dir)
+    os.rmdir(found_dir)
+
+# Dependency install commands, with one named group per ecosystem whose files they write.
+# Installs for different ecosystems don't touch each other's files, so they can run together.
+_INSTALL_RE = re.compile(
+    r"(?:(?P<node>npm install|npm ci|yarn add|yarn install|pnpm install|pnpm add)"
+    r"|(?P<python>pip3? install|python3? -m pip install|pipenv install|poetry install)"
+    r"|(?P<php>composer install|composer require)"
+    r"|(?P<ruby>bundle install)"
+    r"|(?P<go>go mod download|go get)"
+    r"|(?P<dotnet>dotnet restore)"
+    r"|(?P<dart>flutter pub get|dart pub get))\b"
+)
+
+def _install_ecosystem(command):
+    """Return the ecosystem a dependency install command belongs to, or None for other commands"""
+    match = _INSTALL_RE.match(command)
+    return match.lastgroup if match else None
+
+def _prewarm_executable(command):
+    """Read a command's executable in a background thread, so its first launch is served from the page cache.
+
+    The command itself is never run, not even with --version, since setup commands may be arbitrary scripts.
+    """
+    def warm():
+        import shutil
+        try:
+            executable = shutil.which(_split_command(command)[0])
+            if executable:
+                with open(executable, "rb") as f:
+                    while f.read(1 << 20):
+                        pass
+        except (OSError, ValueError, IndexError):
+            pass
+    
+    threading.Thread(target=warm, daemon=True).start()
+
+def _batch_setup_commands(commands):
+    """Split setup commands into batches that can each run concurrently, keeping their order.
+
+    Consecutive installs for different ecosystems share a batch; every other command runs alone.
+    """
+    batches = []
+    batch_ecosystems = set()
+    for command in commands:
+        ecosystem = _install_ecosystem(command)
+        if batch_ecosystems and ecosystem is not None and ecosystem not in batch_ecosystems:
+            batches[-1].append(command)
+            batch_ecosystems.add(ecosystem)
+        else:
+            batches.append([command])
+            batch_ecosystems = {ecosystem} if ecosystem is not None else set()
+    return batches
+
+# Dependency, VCS and build output directories, which never hold the files project detection looks for
+_PROJECT_SKIP_DIRS = frozenset({"node_modules", ".git", ".venv", "venv", "__pycache__", "dist", "build"})
+
+def _walk_project_paths(root, max_depth):
+    """List relative paths (using '/') of files and directories under root, up to max_depth levels deep"""
+    root = str(root)
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root)
+        depth = 0 if rel_dir == "." else rel_dir.count(os.sep) + 1
+        prefix = "" if rel_dir == "." else rel_dir.replace(os.sep, "/") + "/"
+        
+        dirnames[:] = [d for d in dirnames if d not in _PROJECT_SKIP_DIRS]
+        paths.extend(prefix + name for name in dirnames)
+        paths.extend(prefix + name for name in filenames)
+        
+        # Entries at max_depth are recorded but not descended into
+        if depth + 1 >= max_depth:
+            dirnames[:] = []
+    return paths
+
+# package.json scripts that start the app, in order of preference, and the command that runs each
+_RUN_SCRIPT_PRIORITY = ("start", "dev")
+_RUN_SCRIPT_COMMANDS = {"start": "npm start", "dev": "npm run dev"}
+
+# Python entry points used to pick a run command, which may sit in a subdirectory (e.g. Django's mysite/)
+_RUN_SENTINELS = frozenset({"manage.py", "app.py", "main.py"})
+
+def _find_project_sentinels(root, names=_RUN_SENTINELS, max_depth=4):
+    """Find the shallowest file with each of the given names in one walk of the project.
+
+    Names match case-insensitively, so App.py is found on case-sensitive filesystems too.
+    Returns a dict of name -> relative '/' path with the file's actual spelling. Dependency
+    and VCS directories are not descended into, and the walk stops once every name is found.
+    The walk is breadth-first, so a top-level app.py wins over one nested in a subproject.
+    """
+    names_by_casefold = {name.casefold(): name for name in names}
+    found = {}
+    pending = deque([("", str(root), 0)])
+    while pending and len(found) < len(names):
+        prefix, directory, depth = pending.popleft()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if depth + 1 < max_depth and entry.name not in _PROJECT_SKIP_DIRS:
+                            pending.append((prefix + entry.name + "/", entry.path, depth + 1))
+                    else:
+                        name = names_by_casefold.get(entry.name.casefold())
+                        if name is not None and name not in found:
+                            found[name] = prefix + entry.name
+        except OSError:
+            continue
+    return found
+
+def _sentinel_run_command(sentinels):
+    """Run command for the highest-priority entry point in a _find_project_sentinels result, or None"""
+    if "manage.py" in sentinels:
+        return f"python {sentinels['manage.py']} runserver"
+    if "app.py" in sentinels:
+        return "flask run" if sentinels["app.py"] == "app.py" else f"flask --app {sentinels['app.py']} run"
+    if "main.py" in sentinels:
+        return f"python {sentinels['main.py']}"
+    return None
+
+def _find_scaffolded_dir(project_dir, siblings_before):
+    """Find the directory a CREATES_OWN_DIR scaffolder created when it normalized the project name.
+
+    Only names that were not in `siblings_before`, the parent's listing taken before the
+    scaffolder ran, are considered, so a pre-existing directory is never mistaken for its output.
+    """
+    # On case-insensitive filesystems a lowercased name resolves to project_dir itself
+    if project_dir.exists():
+        return None
+    
+    parent = project_dir.parent
+    name = project_dir.name
+    # One directory listing answers every candidate name below
+    siblings = _top_level_names(parent) - siblings_before
+    
+    candidates = dict.fromkeys([
+        name.lower(),
+        name.replace("-", "_"),
+        name.replace("_", "-"),
+        name.lower().replace("_", "-"),
+    ])
+    for candidate in candidates:
+        if candidate != name and candidate in siblings and (parent / candidate).is_dir():
+            return parent / candidate
+    return None
 
 # Global flag to track if API key is validated
 api_key_valid = False
 
+def _find_api_key():
+    """Look up the API key in the environment, .env or config without touching the Gemini client"""
+    _load_dotenv_once()
+    return os.getenv("GEMINI_API_KEY") or load_config().get("api_key")
+
 # Load API key from environment or config
 def load_api_key():
+    import google.generativeai as genai
     global api_key_valid
     
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        config = load_config()
-        api_key = config.get("api_key")
+    api_key = _find_api_key()
     
     if api_key:
         try:
+            # Only configure the client here; the key is validated with a real request in `setup`
             genai.configure(api_key=api_key)
-            # Quick validation attempt - keep this lightweight
-            model = genai.GenerativeModel("gemini-2.0-flash")
-            response = model.generate_content("Test")
             api_key_valid = True
             return True
         except Exception:
@@ -47,8 +626,10 @@ def load_api_key():
     api_key_valid = False
     return False
 
-# Try to load API key on startup
-load_api_key()
+@lru_cache(maxsize=None)
+def _check_api_key():
+    """Load the API key on first use and remember the result for the rest of the process"""
+    return load_api_key()
 
 # Decorator to ensure API key exists before running commands
 def require_api_key(func):
@@ -61,7 +642,7 @@ def require_api_key(func):
             return func(*args, **kwargs)
         
         # Check if API key is valid
-        if not api_key_valid:
+        if not (api_key_valid or _check_api_key()):
             typer.echo("No valid Gemini API key found. Please run 'zor setup' to configure your API key.", err=True)
             raise typer.Exit(1)
             
@@ -101,40 +682,40 @@ def help():
     console.print(table)
     console.print("\nFor more details on a specific command, run: zor [COMMAND] --help")
 
-    if not api_key_valid:
+    if not (api_key_valid or _find_api_key()):
         console.print("\n[bold red]Warning:[/bold red] No valid API key configured. Please run 'zor setup' first.", style="red")
 
 
 @app.command()
 @require_api_key
-def ask(prompt: str):
+def ask(prompt: str, no_cache: NoCacheOption = False):
     """Ask Zor about your codebase"""
-    context = get_codebase_context()
-    response = generate_with_context(prompt, context)
-    print(response)
+    context = _cached_context()
+    # Print the answer as it streams in rather than after the full response arrives
+    generate_with_context(prompt, context, on_chunk=_echo_chunk, use_cache=not no_cache)
+    typer.echo()
 
 
 @app.command()
 @require_api_key
-def edit(file_path: str, prompt: str):
+def edit(file_path: str, prompt: str, no_cache: NoCacheOption = False):
     """Edit a file based on natural language instructions"""
+    path = Path(file_path)
+    
     # Check if file exists first
-    if not Path(file_path).exists():
+    if not path.exists():
         typer.echo(f"Error: File {file_path} does not exist", err=True)
         return
         
     # Get current content of the file
-    with open(file_path, "r") as f:
-        original_content = f.read()
+    original_content = path.read_text(encoding="utf-8")
         
-    context = get_codebase_context()
+    context = _cached_context()
     instruction = f"Modify the file {file_path} to: {prompt}. Return only the complete new file content."
-    response = generate_with_context(instruction, context)
+    response = generate_with_context(instruction, context, use_cache=not no_cache)
     
     # Clean md res
-    import re
-    pattern = r"```(?:\w+)?\n(.*?)```"
-    matches = re.findall(pattern, response, re.DOTALL)
+    matches = _CODE_BLOCK_RE.findall(response)
     
     if matches:
         # Use the first code block found
@@ -175,7 +756,7 @@ def config(key: str = None, value: str = None):
                 typer.echo(f"{k}: {v}")
                 
         # Show API key status
-        if not api_key_valid:
+        if not (api_key_valid or _find_api_key()):
             typer.echo("\nWarning: No valid API key configured. Please run 'zor setup'.", err=True)
         return
     
@@ -206,12 +787,13 @@ def config(key: str = None, value: str = None):
     save_config(current_config)
     typer.echo(f"Updated {key} to {current_config[key]}")
 
+def _echo_chunk(text):
+    """Print a piece of a streamed response without a trailing newline"""
+    typer.echo(text, nl=False)
+
 def extract_code_blocks(text):
     """Extract code blocks from markdown text"""
-    import re
-    pattern = r"```(?:\w+)?\n(.*?)```"
-    matches = re.findall(pattern, text, re.DOTALL)
-    return matches
+    return _CODE_BLOCK_RE.findall(text)
 
 @app.command()
 @require_api_key
@@ -221,11 +803,12 @@ def interactive():
     typer.echo("Loading codebase context...")
     
     # load context once at the start
-    context = get_codebase_context()
+    context = _cached_context()
     typer.echo(f"Loaded context : {len(context)} tokens")
     
-    # conversation history
-    history = []
+    # conversation history, kept as the "User: ..." / "Assistant: ..." text sent to the model
+    # and extended once per message instead of being rebuilt every turn
+    history_str = ""
     
     while True:
         try:
@@ -234,26 +817,23 @@ def interactive():
             if prompt.lower() in ("exit", "quit"):
                 break
                 
-            # add prompt to history
-            history.append({"role": "user", "content": prompt})
-            
-            # create history string
-            history_str = "\n".join(
-                f"{'User' if h['role'] == 'user' else 'Assistant'}: {h['content']}" 
-                for h in history[:-1]
-            )
-            
-            # Create context for API call
-            context_with_history = context.copy()
+            # Create context for API call from the turns before this prompt,
+            # layering the history over the codebase context instead of copying it
             if history_str:
-                context_with_history["_conversation_history"] = history_str
+                context_with_history = ChainMap({"_conversation_history": history_str}, context)
+            else:
+                context_with_history = context
+            
+            # add prompt to history
+            history_str += f"\nUser: {prompt}" if history_str else f"User: {prompt}"
             
             try:
-                answer = generate_with_context(prompt, context_with_history)
-                typer.echo(f"\n{answer}")
+                typer.echo()
+                answer = generate_with_context(prompt, context_with_history, on_chunk=_echo_chunk)
+                typer.echo()
                 
                 # Add response to history
-                history.append({"role": "assistant", "content": answer})
+                history_str += f"\nAssistant: {answer}"
                 
                 # Check if we need to perform file operations
                 if "```" in answer and "edit file" in prompt.lower():
@@ -274,8 +854,11 @@ def interactive():
     
     typer.echo("Interactive session ended.")
 
+def _truncate(text, width=50):
+    """Shorten text to `width` characters, marking the cut with '...'"""
+    return text if len(text) <= width else f"{text[:width]}..."
+
 @app.command()
-@require_api_key
 def history(limit: int = 5):
     """Show conversation history"""
     from rich.console import Console
@@ -294,28 +877,25 @@ def history(limit: int = 5):
     table.add_column("Prompt", style="green")
     table.add_column("Response", style="yellow")
     
-    for item in history_items[-limit:]:
-        # Truncate long text
-        prompt = item["prompt"][:50] + "..." if len(item["prompt"]) > 50 else item["prompt"]
-        response = item["response"][:50] + "..." if len(item["response"]) > 50 else item["response"]
-        
-        table.add_row(item["datetime"], prompt, response)
+    # load_history already returns at most `limit` items
+    for item in history_items:
+        table.add_row(item["datetime"], _truncate(item["prompt"]), _truncate(item["response"]))
     
     console.print(table)
 
 @app.command()
 @require_api_key
-def generate_test(file_path: str, test_framework: str = "pytest"):
+def generate_test(file_path: str, test_framework: str = "pytest", no_cache: NoCacheOption = False):
     """Generate tests for a specific file"""
-    if not Path(file_path).exists():
+    path = Path(file_path)
+    if not path.exists():
         typer.echo(f"Error: File {file_path} does not exist", err=True)
         return
 
-    context = get_codebase_context()
+    context = _cached_context()
     
     # Read the target file
-    with open(file_path, "r") as f:
-        target_file = f.read()
+    target_file = path.read_text(encoding="utf-8")
     
     # Create the prompt
     prompt = f"""Generate comprehensive unit tests for the following file using {test_framework}.
@@ -330,10 +910,10 @@ File to test:
 Existing codebase context is available for reference."""
     
     # Generate the tests
-    tests = generate_with_context(prompt, context)
+    tests = generate_with_context(prompt, context, use_cache=not no_cache)
     
     # Determine test file path
-    test_file_path = str(Path(file_path).parent / f"test_{Path(file_path).name}")
+    test_path = path.parent / f"test_{path.name}"
 
     # clean
     code_blocks = extract_code_blocks(tests)
@@ -352,24 +932,26 @@ Existing codebase context is available for reference."""
     console.print(syntax)
     
     # if test exists -> show diff
-    if Path(test_file_path).exists():
-        with open(test_file_path, "r") as f:
-            existing_test_code = f.read()
-        show_diff(existing_test_code, test_code, test_file_path)
+    if test_path.exists():
+        existing_test_code = test_path.read_text(encoding="utf-8")
+        show_diff(existing_test_code, test_code, str(test_path))
     else:
-        typer.echo(f"Note: Creating new test file at {test_file_path}")
+        typer.echo(f"Note: Creating new test file at {test_path}")
     
     # Ask to save
-    if typer.confirm(f"Save tests to {test_file_path}?"):
-        with open(test_file_path, "w") as f:
-            f.write(tests)
-        typer.echo(f"Tests saved to {test_file_path}")
+    if typer.confirm(f"Save tests to {test_path}?"):
+        # Save the extracted code, not the raw markdown response
+        test_path.write_text(test_code, encoding="utf-8")
+        typer.echo(f"Tests saved to {test_path}")
 
 @app.command()
 @require_api_key
-def refactor(prompt: str):
+def refactor(prompt: str, no_cache: NoCacheOption = False):
     """Refactor code across multiple files based on instructions"""
-    context = get_codebase_context()
+    import asyncio
+    from rich.console import Console
+    
+    context = _cached_context()
     
     instruction = f"""You are a coding assistant helping with a refactoring task across multiple files.
     
@@ -395,12 +977,12 @@ Only include files that need to be changed. Do not include any explanations outs
 """
     
     # Get the refactoring plan
-    refactoring_plan = generate_with_context(instruction, context)
+    refactoring_plan = generate_with_context(instruction, context, use_cache=not no_cache)
     
-    # Parse the plan to extract file paths and contents
-    import re
-    file_changes = re.findall(r"FILE: (.+?)\n```(?:python|java|javascript|typescript)?\n(.+?)```", 
-                             refactoring_plan, re.DOTALL)
+    # Parse the plan to extract file paths and contents, stripping each path once
+    file_changes = [
+        (file_path.strip(), new_content) for file_path, new_content in _FILE_BLOCK_RE.findall(refactoring_plan)
+    ]
     
     if not file_changes:
         typer.echo("No file changes were specified in the response.", err=True)
@@ -409,37 +991,57 @@ Only include files that need to be changed. Do not include any explanations outs
     # Show summary of changes
     typer.echo(f"\nRefactoring will modify {len(file_changes)} files:")
     for file_path, _ in file_changes:
-        typer.echo(f"- {file_path.strip()}")
+        typer.echo(f"- {file_path}")
     
     # Show diffs and ask for confirmation
     if typer.confirm("Show detailed changes?"):
-        for file_path, new_content in file_changes:
-            file_path = file_path.strip()
+        file_paths = [file_path for file_path, _ in file_changes]
+        
+        # Read all current contents concurrently before rendering the diffs in order
+        current_contents = asyncio.run(_run_in_threads(
+            [partial(_read_existing_file, file_path) for file_path in file_paths],
+            limit=max(1, min(32, (os.cpu_count() or 1) * 2))
+        ))
+        
+        # Render the diffs in parallel, then print them in order
+        output_console = Console()
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            rendered_diffs = [
+                None if isinstance(current_content, Exception) else executor.submit(
+                    _render_diff, current_content or "", new_content, file_path, output_console
+                )
+                for file_path, (_, new_content), current_content in zip(file_paths, file_changes, current_contents)
+            ]
+        
+        for file_path, current_content, rendered_diff in zip(file_paths, current_contents, rendered_diffs):
             try:
-                # Read current content if file exists
-                if Path(file_path).exists():
-                    with open(file_path, "r") as f:
-                        current_content = f.read()
-                else:
-                    current_content = ""
+                if isinstance(current_content, Exception):
+                    raise current_content
+                if current_content is None:
                     typer.echo(f"Note: {file_path} will be created.")
                 
                 # Show diff
-                show_diff(current_content, new_content, file_path)
+                typer.echo(rendered_diff.result(), nl=False)
                 
             except Exception as e:
                 typer.echo(f"Error processing {file_path}: {e}", err=True)
     
     # Confirm and apply changes
     if typer.confirm("Apply these changes?"):
-        for file_path, new_content in file_changes:
-            file_path = file_path.strip()
-            
-            # Create directory if needed
-            Path(file_path).parent.mkdir(parents=True, exist_ok=True)
-            
-            # Apply changes
-            if edit_file(file_path, new_content, backup=True, preview=False):
+        # Create directories if needed, once per distinct directory
+        for parent_dir in {Path(file_path).parent for file_path, _ in file_changes}:
+            parent_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Apply changes concurrently; each write and backup is independent
+        results = asyncio.run(_run_in_threads([
+            partial(edit_file, file_path, new_content, backup=True, preview=False)
+            for file_path, new_content in file_changes
+        ]))
+        
+        for (file_path, _), result in zip(file_changes, results):
+            if isinstance(result, Exception):
+                typer.echo(f"Failed to update {file_path}: {result}", err=True)
+            elif result:
                 typer.echo(f"Updated {file_path}")
             else:
                 typer.echo(f"Failed to update {file_path}", err=True)
@@ -454,6 +1056,8 @@ Only include files that need to be changed. Do not include any explanations outs
 @app.command()
 def setup():
     """Configure your Gemini API key"""
+    import google.generativeai as genai
+    from rich.console import Console
     global api_key_valid
 
     zor_ascii = r"""
@@ -504,23 +1108,24 @@ def setup():
     # Create .env file or update existing one
     env_path = Path(".env")
     
-    # Check if file exists and contains the API key
-    env_content = ""
-    if env_path.exists():
-        with open(env_path, "r") as f:
-            env_content = f.read()
-    
-    # Update or add the API key
-    if "GEMINI_API_KEY=" in env_content:
-        import re
-        env_content = re.sub(r"GEMINI_API_KEY=.*", f"GEMINI_API_KEY={api_key}", env_content)
-    else:
-        env_content += f"\nGEMINI_API_KEY={api_key}\n"
-    
-    # Write the updated content
     try:
-        with open(env_path, "w") as f:
-            f.write(env_content)
+        # Nothing to write if this key was already loaded from the environment or .env
+        _load_dotenv_once()
+        if os.environ.get("GEMINI_API_KEY") != api_key:
+            # Check if file exists and contains the API key
+            env_content = ""
+            if env_path.exists():
+                env_content = env_path.read_text(encoding="utf-8")
+            
+            if "GEMINI_API_KEY=" in env_content:
+                # Update the existing key in place
+                env_path.write_text(
+                    _ENV_KEY_RE.sub(lambda _: f"GEMINI_API_KEY={api_key}", env_content), encoding="utf-8"
+                )
+            else:
+                # Append the key without rewriting the rest of the file
+                with open(env_path, "a") as f:
+                    f.write(f"\nGEMINI_API_KEY={api_key}\n")
         
         # Also store in global config
         config["api_key"] = api_key
@@ -541,8 +1146,14 @@ def setup():
 
 @app.command()
 @require_api_key
-def init(prompt: str, directory: str = None, install: bool = typer.Option(True, "--install", "-i", help="Install dependencies after project creation"), run: bool = typer.Option(True, "--run", "-r", help="Run the application after setup")):
+def init(prompt: str, directory: str = None, install: bool = typer.Option(True, "--install", "-i", help="Install dependencies after project creation"), run: bool = typer.Option(True, "--run", "-r", help="Run the application after setup"), parallel_setup: bool = typer.Option(False, "--parallel-setup", help="Run consecutive setup installs for different ecosystems concurrently")):
     """Create a new project based on natural language instructions and optionally install dependencies and run the app"""
+    import asyncio
+    from rich.console import Console
+    from rich.markup import escape
+    from rich.panel import Panel
+    from rich.table import Table
+    
     console = Console()
     
     # Handle project directory
@@ -570,7 +1181,7 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
     orig_project_dir = project_dir
     
     # Check if directory exists
-    if project_dir.exists() and any(project_dir.iterdir()):
+    if project_dir.exists() and _dir_has_entries(project_dir):
         if not typer.confirm(f"Directory {project_dir} exists and is not empty. Continue anyway?", default=False):
             typer.echo("Project initialization cancelled.")
             raise typer.Exit()
@@ -654,30 +1265,14 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
         plan_response = generate_with_context(planning_prompt, context)
         
         # Parse the response to extract project information
-        import re
-        import shlex
         import subprocess
         import sys
         import os
         import shutil
         import json
         
-        # Extract all sections with improved regex patterns
-        sections = {
-            "project_type": re.search(r"PROJECT_TYPE:\s*(.*?)(?:\n\s*\n|\n\s*[A-Z_]+:)", plan_response + "\n\n", re.DOTALL),
-            "main_technologies": re.search(r"MAIN_TECHNOLOGIES:\s*(.*?)(?:\n\s*\n|\n\s*[A-Z_]+:)", plan_response + "\n\n", re.DOTALL),
-            "architecture": re.search(r"ARCHITECTURE:\s*(.*?)(?:\n\s*\n|\n\s*[A-Z_]+:)", plan_response + "\n\n", re.DOTALL),
-            "scaffold_command": re.search(r"SCAFFOLD_COMMAND:\s*(.*?)(?:\n\s*\n|\n\s*[A-Z_]+:)", plan_response + "\n\n", re.DOTALL),
-            "scaffold_type": re.search(r"SCAFFOLD_TYPE:\s*(.*?)(?:\n\s*\n|\n\s*[A-Z_]+:)", plan_response + "\n\n", re.DOTALL),
-            "dependencies": re.search(r"DEPENDENCIES:(.*?)(?:\n\s*\n|\n\s*[A-Z_]+:)", plan_response + "\n\n", re.DOTALL),
-            "setup_commands": re.search(r"SETUP_COMMANDS:(.*?)(?:\n\s*\n|\n\s*[A-Z_]+:)", plan_response + "\n\n", re.DOTALL),
-            "development_recommendations": re.search(r"DEVELOPMENT_RECOMMENDATIONS:(.*?)(?:\n\s*\n|\n\s*[A-Z_]+:|$)", plan_response + "\n\n", re.DOTALL)
-        }
-        
-        # Process extracted sections
-        project_info = {}
-        for key, match in sections.items():
-            project_info[key] = match.group(1).strip() if match else "Not specified"
+        # Extract all sections in one pass over the response
+        project_info = _parse_plan_sections(plan_response)
         
         # Get project information with fallbacks
         project_type = project_info.get("project_type", "Unknown")
@@ -685,6 +1280,9 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
         scaffold_command = project_info.get("scaffold_command", "NONE")
         scaffold_type = project_info.get("scaffold_type", "NONE").upper()
         dependencies = project_info.get("dependencies", "")
+        main_technologies = project_info.get("main_technologies", "Not specified")
+        architecture = project_info.get("architecture", "Not specified")
+        has_scaffold_command = bool(scaffold_command) and scaffold_command.lower() not in ("none", "not specified")
         
         # Extract specific dependencies for later installation
         extracted_dependencies = []
@@ -698,7 +1296,7 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
                     # - react-router-dom: ^6.0.0
                     # - react-router-dom ^6.0.0
                     # - react-router-dom
-                    parts = re.split(r'[:,\s]\s*', line.lstrip('- ').strip())
+                    parts = _DEPENDENCY_SPLIT_RE.split(line.lstrip('- ').strip())
                     if parts:
                         package_name = parts[0].strip()
                         version = parts[1].strip() if len(parts) > 1 else ""
@@ -714,13 +1312,13 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
         console.print("\n[bold cyan]📋 Project Blueprint[/bold cyan]")
         console.print(f"\n[bold]Project Type:[/bold] {project_type}")
         
-        if project_info.get("main_technologies") != "Not specified":
+        if main_technologies != "Not specified":
             console.print(f"\n[bold]Main Technologies:[/bold]")
-            console.print(project_info.get("main_technologies"))
+            console.print(main_technologies)
             
-        if project_info.get("architecture") != "Not specified":
+        if architecture != "Not specified":
             console.print(f"\n[bold]Architecture:[/bold]")
-            console.print(project_info.get("architecture"))
+            console.print(architecture)
         
         console.print("\n[bold]Project Plan:[/bold]")
         console.print(plan_response)
@@ -730,11 +1328,72 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
             typer.echo("Project initialization cancelled.")
             raise typer.Exit()
         
+        # Environment shared by every command init spawns, built once rather than inherited per call.
+        # Silencing npm's update check saves a network round-trip on each npm/npx invocation.
+        command_env = {**os.environ, "NO_UPDATE_NOTIFIER": "1", "npm_config_update_notifier": "false"}
 
+        # Improved file generation prompt with more context - now considers scaffolded files
+        file_generation_prompt = f"""
+        Based on the project description: "{prompt}"
+        
+        And identified project type: {project_type}
+        
+        {"A scaffolding command was executed to set up the basic project structure using the official tools for this framework/language." if has_scaffold_command else "No scaffolding command was executed. You need to provide all necessary files for a complete project."}
+        
+        Generate the content for {"additional" if has_scaffold_command else ""} key files needed in the project. For each file, provide:
+        1. The file path relative to the project root
+        2. The complete content of the file
+        3. A brief comment at the top of each file explaining its purpose
+        
+        Format your response like this:
+        
+        FILE: path/to/file1
+        ```
+        // Purpose: Brief explanation of this file's role in the project
+        // content of file1
+        ```
+        
+        FILE: path/to/file2
+        ```
+        // Purpose: Brief explanation of this file's role in the project
+        // content of file2
+        ```
+        
+        IMPORTANT GUIDELINES:
+        - {"If scaffolding was executed, focus on customizing and extending the scaffolded project. Do not recreate files that are typically generated by the scaffolding tool." if has_scaffold_command else "Provide a complete set of files for a functioning project."}
+        - Always include a comprehensive README.md with:
+          * Project description and features
+          * Setup instructions (installation, configuration)
+          * Usage examples with code snippets
+          * API documentation if applicable
+          * Contribution guidelines
+        - Include appropriate configuration files (.gitignore, package.json, requirements.txt, etc.) if not already created by scaffolding
+        - Provide complete, functional code for each file (no placeholders or TODOs)
+        - Ensure code follows best practices and style conventions for the language/framework
+        - Add appropriate comments and documentation in the code
+        - Include unit tests where appropriate
+        
+        For specific frameworks, ensure you include:
+        - React: Component files, styling, routing if needed
+        - Angular: Modules, components, services
+        - Vue: Components, views, router setup
+        - Node.js: Controllers, models, routes
+        - Python: Modules, packages, tests
+        - Django: Models, views, templates, URLs
+        - Flask: Routes, templates, forms
+        - Spring Boot: Controllers, services, repositories
+        - Laravel: Controllers, models, migrations, views
+        - .NET: Controllers, models, views
+        - Flutter: Widgets, services, state management
+        """
+        
+        # Filled in while the scaffolding command runs, if there is one
+        files_response = None
+        
         # Replace the existing scaffold command execution section with this improved version
-        if scaffold_command and scaffold_command.lower() != "none":
+        if has_scaffold_command:
             # Parse the original scaffold command
-            command_parts = shlex.split(scaffold_command)
+            command_parts = list(_split_command(scaffold_command))
             project_name = project_dir.name
             
             # Handle different scaffold types properly
@@ -862,16 +1521,9 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
                         scaffold_command = f"ng new {project_name}{ng_flags}"
                 else:
                     # Default behavior for other commands
-                    has_project_arg = False
-                    project_name_position = -1
-                    for i, part in enumerate(command_parts[1:], 1):  # Skip the executable
-                        if not part.startswith("-") and "/" not in part and "=" not in part:
-                            has_project_arg = True
-                            project_name_position = i
-                            break
+                    project_name_position = _project_arg_index(command_parts)
 
-                    if has_project_arg:
-                        original_name = command_parts[project_name_position]
+                    if project_name_position is not None:
                         command_parts[project_name_position] = project_name
                         scaffold_command = " ".join(command_parts)
                     else:
@@ -884,7 +1536,7 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
                 
                 # Check if we need to remove the existing directory
                 if project_dir.exists():
-                    if any(project_dir.iterdir()):
+                    if _dir_has_entries(project_dir):
                         if typer.confirm(f"Directory {project_dir} exists. Remove it for clean scaffolding?", default=False):
                             try:
                                 shutil.rmtree(project_dir)
@@ -904,20 +1556,18 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
                 
                 # The working directory will be the parent directory
                 working_dir = project_dir.parent
+                # Remember what was already there, so only directories the scaffolder creates are moved
+                siblings_before_scaffold = _top_level_names(working_dir)
 
                 
                 
             elif scaffold_type == "NEEDS_EMPTY_DIR":
                 # For NEEDS_EMPTY_DIR, we'll run inside the project directory but ensure it's empty
-                if any(project_dir.iterdir()):
+                if _dir_has_entries(project_dir):
                     if typer.confirm(f"Directory {project_dir} is not empty. Clear it for scaffolding?", default=False):
                         try:
                             # Remove all contents but keep the directory
-                            for item in project_dir.iterdir():
-                                if item.is_dir():
-                                    shutil.rmtree(item)
-                                else:
-                                    item.unlink()
+                            _fast_empty_dir(project_dir)
                             console.print(f"[bold]Cleared directory contents: {project_dir}[/bold]")
                         except Exception as e:
                             console.print(f"[bold red]Error clearing directory: {str(e)}[/bold red]")
@@ -925,13 +1575,12 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
                                 typer.echo("Project initialization cancelled.")
                                 raise typer.Exit()
                 
-                # Check if the command has a project name and remove it if needed
-                for i, part in enumerate(command_parts[1:], 1):
-                    if not part.startswith("-") and "/" not in part and "=" not in part:
-                        # Remove the project name since we're running in the directory already
-                        command_parts.pop(i)
-                        scaffold_command = " ".join(command_parts)
-                        break
+                # Check if the command has a project name and remove it if needed,
+                # since we're running in the directory already
+                project_name_position = _project_arg_index(command_parts)
+                if project_name_position is not None:
+                    del command_parts[project_name_position]
+                    scaffold_command = " ".join(command_parts)
                 
                 working_dir = project_dir
                 
@@ -939,11 +1588,9 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
                 # For IN_PLACE, we'll just run in the directory
                 working_dir = project_dir
             
-            # If command has placeholders, replace them
-            if "{project_name}" in scaffold_command:
-                scaffold_command = scaffold_command.replace("{project_name}", project_name)
-            if "{project_dir}" in scaffold_command:
-                scaffold_command = scaffold_command.replace("{project_dir}", str(project_dir))
+            # If command has placeholders, replace them in a single pass
+            placeholders = {"project_name": project_name, "project_dir": str(project_dir)}
+            scaffold_command = _PLACEHOLDER_RE.sub(lambda m: placeholders[m[1]], scaffold_command)
             
             # Ask user permission to run the scaffold command
             console.print(f"\n[bold]Official scaffolding command detected:[/bold]")
@@ -954,79 +1601,54 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
             if typer.confirm("\nRun this scaffolding command?", default=True):
                 console.print("\n[bold green]Executing scaffolding command...[/bold green]")
                 
-                # Replace the existing subprocess.run block with this improved version that handles interactive inputs
                 try:
-                    # Handle platform-specific command execution
-                    shell = False
-                    if sys.platform == "win32":
-                        shell = True
-                        # On Windows, use shell=True for npm/npx commands
-                        
-                        # Check if this is an interactive command (Next.js, Vue, etc.)
-                        requires_interaction = (
-                            "create-next-app" in scaffold_command and "--typescript" not in scaffold_command or
-                            "vue@latest" in scaffold_command and "--typescript" not in scaffold_command or
-                            "ng new" in scaffold_command and "--routing" not in scaffold_command
-                        )
-                        
-                        if requires_interaction:
-                            console.print("[yellow]Running interactive command. Please respond to prompts...[/yellow]")
-                            # For interactive commands, don't capture output so user can interact directly
-                            process = subprocess.run(
-                                scaffold_command,
-                                cwd=working_dir,
-                                shell=shell
-                            )
-                        else:
-                            # Non-interactive commands can capture output
-                            process = subprocess.run(
-                                scaffold_command,
-                                cwd=working_dir,
-                                capture_output=True,
-                                text=True,
-                                shell=shell
-                            )
-                    else:
-                        # Split the command properly using shlex for Unix-like systems
-                        command_args = shlex.split(scaffold_command)
-                        
-                        # Check if this is an interactive command (Next.js, Vue, etc.)
-                        requires_interaction = (
-                            "create-next-app" in scaffold_command and "--typescript" not in scaffold_command or
-                            "vue@latest" in scaffold_command and "--typescript" not in scaffold_command or
-                            "ng new" in scaffold_command and "--routing" not in scaffold_command
-                        )
-                        
-                        if requires_interaction:
-                            console.print("[yellow]Running interactive command. Please respond to prompts...[/yellow]")
-                            # For interactive commands, don't capture output so user can interact directly
-                            process = subprocess.run(
-                                command_args,
-                                cwd=working_dir,
-                                shell=shell
-                            )
-                        else:
-                            # Non-interactive commands can capture output
-                            process = subprocess.run(
-                                command_args,
-                                cwd=working_dir,
-                                capture_output=True,
-                                text=True,
-                                shell=shell
-                            )
+                    # Check if this is an interactive command (Next.js, Vue, etc.)
+                    requires_interaction = (
+                        "create-next-app" in scaffold_command and "--typescript" not in scaffold_command or
+                        "vue@latest" in scaffold_command and "--typescript" not in scaffold_command or
+                        "ng new" in scaffold_command and "--routing" not in scaffold_command
+                    )
                     
-                    if process.returncode == 0:
-                        if hasattr(process, 'stdout') and process.stdout:
-                            console.print(f"[bold green]Scaffolding completed successfully![/bold green]")
-                            console.print(process.stdout)
-                        else:
-                            console.print(f"[bold green]Scaffolding completed successfully![/bold green]")
+                    if requires_interaction:
+                        console.print("[yellow]Running interactive command. Please respond to prompts...[/yellow]")
+                    
+                    # Run the scaffolder and, meanwhile, ask the model for the additional project files.
+                    # Interactive commands keep the terminal so the user can answer prompts directly;
+                    # otherwise output is streamed line by line as the scaffolder produces it.
+                    # On Windows, use the shell for npm/npx commands.
+                    scaffold_result, generation_result = asyncio.run(_run_concurrently(
+                        _stream_command(
+                            scaffold_command,
+                            cwd=working_dir,
+                            env=command_env,
+                            use_shell=_IS_WIN,
+                            on_line=None if requires_interaction else partial(console.out, highlight=False)
+                        ),
+                        generate_with_context_async(file_generation_prompt, context)
+                    ))
+                    
+                    # A failed generation is retried after scaffolding, where its error is reported
+                    if not isinstance(generation_result, Exception):
+                        files_response = generation_result
+                    if isinstance(scaffold_result, Exception):
+                        raise scaffold_result
+                    
+                    if scaffold_result == 0:
+                        console.print(f"[bold green]Scaffolding completed successfully![/bold green]")
+                        
+                        # Verify the scaffolder created the directory where we expected it
+                        if scaffold_type == "CREATES_OWN_DIR":
+                            found_dir = _find_scaffolded_dir(project_dir, siblings_before_scaffold)
+                            if found_dir:
+                                console.print(f"[yellow]Scaffolding created {found_dir} instead of {project_dir}. Moving files...[/yellow]")
+                                try:
+                                    project_dir.mkdir(parents=True, exist_ok=True)
+                                    # Move files from found_dir to project_dir
+                                    _move_scaffolded_files(found_dir, project_dir)
+                                except Exception as e:
+                                    console.print(f"[bold red]Error moving scaffolded files: {str(e)}[/bold red]")
                     else:
-                        if hasattr(process, 'stderr') and process.stderr:
-                            console.print(f"[bold red]Scaffolding command failed with code {process.returncode}[/bold red]")
-                            console.print(f"Error: {process.stderr}")
-                        else:
-                            console.print(f"[bold red]Scaffolding command failed with code {process.returncode}[/bold red]")
+                        console.print(f"[bold red]Scaffolding command failed with code {scaffold_result}[/bold red]")
                         
                         # Ask if user wants to continue with file generation even though scaffolding failed
                         if not typer.confirm("Continue with file generation anyway?", default=False):
@@ -1039,68 +1661,17 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
                     if not typer.confirm("Continue with file generation anyway?", default=False):
                         typer.echo("Project initialization cancelled.")
                         raise typer.Exit()
-        # Improved file generation prompt with more context - now considers scaffolded files
-        file_generation_prompt = f"""
-        Based on the project description: "{prompt}"
-        
-        And identified project type: {project_type}
-        
-        {"A scaffolding command was executed to set up the basic project structure using the official tools for this framework/language." if scaffold_command and scaffold_command.lower() != "none" else "No scaffolding command was executed. You need to provide all necessary files for a complete project."}
-        
-        Generate the content for {"additional" if scaffold_command and scaffold_command.lower() != "none" else ""} key files needed in the project. For each file, provide:
-        1. The file path relative to the project root
-        2. The complete content of the file
-        3. A brief comment at the top of each file explaining its purpose
-        
-        Format your response like this:
-        
-        FILE: path/to/file1
-        ```
-        // Purpose: Brief explanation of this file's role in the project
-        // content of file1
-        ```
-        
-        FILE: path/to/file2
-        ```
-        // Purpose: Brief explanation of this file's role in the project
-        // content of file2
-        ```
-        
-        IMPORTANT GUIDELINES:
-        - {"If scaffolding was executed, focus on customizing and extending the scaffolded project. Do not recreate files that are typically generated by the scaffolding tool." if scaffold_command and scaffold_command.lower() != "none" else "Provide a complete set of files for a functioning project."}
-        - Always include a comprehensive README.md with:
-          * Project description and features
-          * Setup instructions (installation, configuration)
-          * Usage examples with code snippets
-          * API documentation if applicable
-          * Contribution guidelines
-        - Include appropriate configuration files (.gitignore, package.json, requirements.txt, etc.) if not already created by scaffolding
-        - Provide complete, functional code for each file (no placeholders or TODOs)
-        - Ensure code follows best practices and style conventions for the language/framework
-        - Add appropriate comments and documentation in the code
-        - Include unit tests where appropriate
-        
-        For specific frameworks, ensure you include:
-        - React: Component files, styling, routing if needed
-        - Angular: Modules, components, services
-        - Vue: Components, views, router setup
-        - Node.js: Controllers, models, routes
-        - Python: Modules, packages, tests
-        - Django: Models, views, templates, URLs
-        - Flask: Routes, templates, forms
-        - Spring Boot: Controllers, services, repositories
-        - Laravel: Controllers, models, migrations, views
-        - .NET: Controllers, models, views
-        - Flutter: Widgets, services, state management
-        """
-        
-        # Generate file contents
-        with console.status("[bold green]Generating additional project files...", spinner="dots") as status:
-            files_response = generate_with_context(file_generation_prompt, context)
-            status.stop()
+        # Generate file contents, unless that already happened alongside scaffolding
+        if files_response is None:
+            with console.status("[bold green]Generating additional project files...", spinner="dots") as status:
+                files_response = generate_with_context(file_generation_prompt, context)
+                status.stop()
             
-        # Parse the response to extract file paths and contents
-        file_matches = re.findall(r"FILE: (.+?)\n```(?:\w+)?\n(.+?)```", files_response, re.DOTALL)
+        # Parse the response in one scan, resolving each file's target path as it is matched
+        file_matches = []
+        for match in _FILE_BLOCK_RE.finditer(files_response):
+            file_path = match[1].strip()
+            file_matches.append((file_path, project_dir / file_path, match[2]))
         
         if not file_matches:
             typer.echo("Error: Could not parse file generation response", err=True)
@@ -1114,22 +1685,30 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
         failed_files = []
         skipped_files = []
         
-        # Extract dependency imports from React files to add to package.json later
-        import_patterns = [
-            r'import\s+.*?\s+from\s+[\'"]([^.][^\'"]*)[\'"]\s*;?',  # ES6 imports
-            r'require\s*\(\s*[\'"]([^.][^\'"]*)[\'"]\s*\)',  # CommonJS imports
-            r'@import\s+[\'"]([^.][^\'"]*)[\'"]\s*;?',      # CSS imports
-        ]
-        
+        # Dependency imports from React files, to add to package.json later
         detected_dependencies = set()
-        
-        for file_path, content in file_matches:
-            full_path = project_dir / file_path.strip()
-            
+
+        # Create each distinct parent directory once, shallowest first, instead of per file
+        parent_dirs = {full_path.parent for _, full_path, _ in file_matches}
+        for parent_dir in sorted(parent_dirs, key=lambda p: len(p.parts)):
+            try:
+                parent_dir.mkdir(parents=True, exist_ok=True)
+            except OSError:
+                # The write below will fail and be reported for the affected files
+                pass
+
+        # Per-file status lines, printed together once all files are written
+        creation_messages = []
+        # (file_path, full_path, content, overwrite) for every file that will be written
+        pending_writes = []
+        # Index into pending_writes of each path already queued, so a repeated FILE block replaces it
+        queued_writes = {}
+        
+        for file_path, full_path, content in file_matches:
             # Check if this is a JS/JSX/TS/TSX file to scan for imports
             if file_path.endswith(('.js', '.jsx', '.ts', '.tsx')):
-                for pattern in import_patterns:
-                    imports = re.findall(pattern, content)
+                for import_re in _JS_IMPORT_RES:
+                    imports = import_re.findall(content)
                     for imported in imports:
                         # Filter out relative imports and standard node modules
                         if (not imported.startswith('.') and 
@@ -1153,65 +1732,74 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
                             
                             detected_dependencies.add(base_package)
             
+            # The response may contain the same path twice; ask again, as for any existing file,
+            # and let the later block replace the queued one instead of racing it
+            queued_index = queued_writes.get(full_path)
+            if queued_index is not None:
+                if typer.confirm(f"File {file_path} appears more than once in the response. Use the later version?", default=False):
+                    overwrite = pending_writes[queued_index][3]
+                    pending_writes[queued_index] = (file_path, full_path, content, overwrite)
+                continue
+            
             # Check if file already exists (might have been created by scaffolding)
             if full_path.exists():
                 # Ask if user wants to overwrite existing files
                 if typer.confirm(f"File {file_path} already exists. Overwrite?", default=False):
-                    try:
-                        with open(full_path, "w") as f:
-                            f.write(content)
-                        created_files.append(str(full_path))
-                        console.print(f"Overwritten: [blue]{file_path}[/blue]")
-                    except Exception as e:
-                        failed_files.append((file_path, str(e)))
-                        console.print(f"Error overwriting {file_path}: {str(e)}", style="bold red")
+                    queued_writes[full_path] = len(pending_writes)
+                    pending_writes.append((file_path, full_path, content, True))
                 else:
-                    console.print(f"Skipped (already exists): [yellow]{file_path}[/yellow]")
+                    creation_messages.append(f"Skipped (already exists): [yellow]{file_path}[/yellow]")
                     skipped_files.append(str(full_path))
                 continue
-                  
-            # Create directories if they don't exist
-            try:
-                full_path.parent.mkdir(parents=True, exist_ok=True)
-                
-                # Write the file
-                with open(full_path, "w") as f:
-                    f.write(content)
+            
+            queued_writes[full_path] = len(pending_writes)
+            pending_writes.append((file_path, full_path, content, False))
+        
+        # Write all files concurrently once every overwrite question has been answered
+        # (parent directories were created above)
+        write_results = asyncio.run(_run_in_threads([
+            partial(_write_generated_file, os.fspath(full_path), content)
+            for _, full_path, content, _ in pending_writes
+        ]))
+        
+        for (file_path, full_path, _, overwrite), result in zip(pending_writes, write_results):
+            if isinstance(result, Exception):
+                failed_files.append((file_path, str(result)))
+                action = "overwriting" if overwrite else "creating"
+                creation_messages.append(f"[bold red]Error {action} {file_path}: {str(result)}[/bold red]")
+            else:
                 created_files.append(str(full_path))
-                console.print(f"Created: [green]{file_path}[/green]")
-            except Exception as e:
-                failed_files.append((file_path, str(e)))
-                console.print(f"Error creating {file_path}: {str(e)}", style="bold red")
+                if overwrite:
+                    creation_messages.append(f"Overwritten: [blue]{file_path}[/blue]")
+                else:
+                    creation_messages.append(f"Created: [green]{file_path}[/green]")
+        
+        if creation_messages:
+            console.print("\n".join(creation_messages))
+        
+        # Used after the check below as well, so they stay bound even if it fails part way
+        detected_types = []
+        is_node_project = is_python_project = False
         
         # After creating files but before running setup commands, check for important files
         try:
             # Check for important files based on project type
             missing_files = []
-            critical_file_patterns = {
-                "react": ["package.json", "src/App.*", "public/index.html"],
-                "vue": ["package.json", "src/App.vue", "src/main.js"],
-                "angular": ["package.json", "angular.json", "src/app"],
-                "next.js": ["package.json", "next.config.js"],
-                "express": ["package.json", "app.js"],
-                "django": ["manage.py", "*/settings.py"],
-                "flask": ["app.py", "requirements.txt"],
-                "spring": ["pom.xml", "src/main/java"],
-                "laravel": ["composer.json", "artisan"],
-                ".net": ["*.csproj", "Program.cs"],
-                "flutter": ["pubspec.yaml", "lib/main.dart"]
-            }
-            
             # Determine project type based on keywords in project_type
-            detected_types = []
             project_type_lower = project_type.lower()
             
-            for framework in critical_file_patterns.keys():
-                if framework.lower() in project_type_lower:
+            for framework in _CRITICAL_FILE_PATTERNS:
+                if framework in project_type_lower:
                     detected_types.append(framework)
             
-            # Determine if this is a Node.js or other type of project
-            is_node_project = (project_dir / "package.json").exists()
-            is_python_project = (project_dir / "requirements.txt").exists() or (project_dir / "setup.py").exists() or list(project_dir.glob("*.py"))
+            # Determine if this is a Node.js or other type of project from one directory listing
+            top_level_names = _top_level_names(project_dir)
+            is_node_project = "package.json" in top_level_names
+            is_python_project = (
+                "requirements.txt" in top_level_names
+                or "setup.py" in top_level_names
+                or any(name.endswith(".py") for name in top_level_names)
+            )
             
             # If no specific type detected but we have additional clues
             if not detected_types:
@@ -1231,35 +1819,31 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
                     detected_types.append("flask")
             
             # Check for missing critical files for each detected type
-            for detected_type in detected_types:
-                patterns = critical_file_patterns.get(detected_type, [])
-                for pattern in patterns:
-                    # Handle wildcards in patterns
-                    found = False
-                    if "*" in pattern:
-                        matching_files = list(project_dir.glob(pattern))
-                        found = len(matching_files) > 0
-                    else:
-                        found = (project_dir / pattern).exists()
-                    
-                    if not found:
-                        missing_files.append((detected_type, pattern))
+            if detected_types:
+                project_paths = _walk_project_paths(project_dir, _CRITICAL_FILE_MAX_DEPTH)
+                for detected_type in detected_types:
+                    for pattern, pattern_re in _CRITICAL_FILE_PATTERNS.get(detected_type, []):
+                        if not any(pattern_re.fullmatch(path) for path in project_paths):
+                            missing_files.append((detected_type, pattern))
             
-            # Notify user of missing files
             # Notify user of missing files
             if missing_files:
-                console.print("\n[bold yellow]Warning: Some expected files are missing:[/bold yellow]")
-                for framework, file_pattern in missing_files:
-                    console.print(f" - Missing [{framework}]: {file_pattern}")
-                console.print("This may indicate incomplete project scaffolding. Consider checking the files manually.")
+                console.print("\n".join([
+                    "\n[bold yellow]Warning: Some expected files are missing:[/bold yellow]",
+                    *(f" - Missing [{framework}]: {file_pattern}" for framework, file_pattern in missing_files),
+                    "This may indicate incomplete project scaffolding. Consider checking the files manually.",
+                ]))
         except Exception as e:
             console.print(f"\n[bold yellow]Warning: Error checking for critical files: {str(e)}[/bold yellow]")
         
         # Merge detected dependencies with those from the plan
         if detected_dependencies:
-            console.print(f"\n[bold cyan]Detected additional dependencies from imports:[/bold cyan]")
-            for dep in sorted(detected_dependencies):
-                console.print(f" - {dep}")
+            sorted_dependencies = sorted(detected_dependencies)
+            console.print("\n".join([
+                "\n[bold cyan]Detected additional dependencies from imports:[/bold cyan]",
+                *(f" - {dep}" for dep in sorted_dependencies),
+            ]))
+            for dep in sorted_dependencies:
                 if dep not in extracted_dependencies:
                     extracted_dependencies.append(dep)
         
@@ -1268,8 +1852,7 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
             package_json_path = project_dir / "package.json"
             if package_json_path.exists():
                 try:
-                    with open(package_json_path, "r") as f:
-                        package_data = json.load(f)
+                    package_data = _read_package_json(package_json_path)
                     
                     # Check if dependencies section exists
                     if "dependencies" not in package_data:
@@ -1284,62 +1867,92 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
                     
                     # Save updated package.json
                     if dependencies_modified:
-                        with open(package_json_path, "w") as f:
-                            json.dump(package_data, f, indent=2)
+                        _write_package_json(package_json_path, package_data)
                         console.print(f"[bold green]Updated package.json with detected dependencies[/bold green]")
                 except Exception as e:
                     console.print(f"[bold yellow]Could not update package.json: {str(e)}[/bold yellow]")
         
-        # Provide a summary of file creation
-        console.print("\n[bold cyan]Project Creation Summary:[/bold cyan]")
-        console.print(f"Created {len(created_files)} files")
+        # Provide a summary of file creation, one table render each instead of a print per file
+        summary_table = Table(title="Project Creation Summary", title_style="bold cyan", min_width=40)
+        summary_table.add_column("Status")
+        summary_table.add_column("Files", justify="right")
+        summary_table.add_row("Created", str(len(created_files)))
         if skipped_files:
-            console.print(f"Skipped {len(skipped_files)} existing files")
+            summary_table.add_row("Skipped (already existed)", str(len(skipped_files)))
+        if failed_files:
+            summary_table.add_row("[bold red]Failed[/bold red]", f"[bold red]{len(failed_files)}[/bold red]")
+        console.print()
+        console.print(summary_table)
+        
         if failed_files:
-            console.print(f"[bold red]Failed to create {len(failed_files)} files[/bold red]")
+            failed_table = Table(title="Failed Files", title_style="bold red")
+            failed_table.add_column("File")
+            failed_table.add_column("Error")
             for file_path, error in failed_files:
-                console.print(f" - {file_path}: {error}")
+                # Errors such as "[Errno 13] ..." must not be read as markup
+                failed_table.add_row(escape(file_path), escape(error))
+            console.print(failed_table)
         
         # Execute setup commands if provided
         if setup_commands and setup_commands.strip():
-            setup_cmds = [cmd.strip() for cmd in setup_commands.split('\n') if cmd.strip()]
+            setup_cmds = [cmd for cmd in map(_clean_setup_command, setup_commands.split('\n')) if cmd]
             
             if setup_cmds:
-                console.print("\n[bold cyan]Setup Commands:[/bold cyan]")
-                for cmd in setup_cmds:
-                    console.print(f" - {cmd}")
+                console.print("\n".join(["\n[bold cyan]Setup Commands:[/bold cyan]", *(f" - {cmd}" for cmd in setup_cmds)]))
                 
+                # Warm up the first command's executable while the user answers
+                _prewarm_executable(setup_cmds[0])
                 if typer.confirm("\nRun setup commands?", default=True):
-                    for cmd in setup_cmds:
-                        console.print(f"\n[bold green]Executing: {cmd}[/bold green]")
-                        try:
-                            # Handle platform-specific command execution
-                            shell = True if sys.platform == "win32" else False
-                            process = subprocess.run(
-                                cmd,
-                                cwd=project_dir,
-                                shell=shell,
-                                capture_output=True,
-                                text=True
-                            )
-                            
-                            if process.returncode == 0:
-                                console.print("[green]Command executed successfully[/green]")
-                                if process.stdout.strip():
-                                    console.print(process.stdout)
+                    # Handle platform-specific command execution; output is shown as it arrives
+                    shell = _IS_WIN
+                    
+                    # Setup commands run one at a time unless independent installs may overlap
+                    batches = _batch_setup_commands(setup_cmds) if parallel_setup else [[cmd] for cmd in setup_cmds]
+                    for batch in batches:
+                        for cmd in batch:
+                            console.print(f"\n[bold green]Executing: {cmd}[/bold green]")
+                        
+                        if len(batch) == 1:
+                            try:
+                                results = [_run_streamed(
+                                    batch[0],
+                                    cwd=project_dir,
+                                    env=command_env,
+                                    shell=shell,
+                                    on_line=partial(console.out, highlight=False)
+                                )[0]]
+                            except Exception as e:
+                                results = [e]
+                        else:
+                            # Independent installs run together; each line is tagged with its ecosystem
+                            results = asyncio.run(_run_concurrently(*[
+                                _stream_command(
+                                    cmd,
+                                    cwd=project_dir,
+                                    env=command_env,
+                                    use_shell=shell,
+                                    on_line=partial(console.out, f"[{_install_ecosystem(cmd)}]", highlight=False)
+                                )
+                                for cmd in batch
+                            ]))
+                        
+                        any_failed = False
+                        for cmd, result in zip(batch, results):
+                            label = f"{cmd}: " if len(batch) > 1 else ""
+                            if isinstance(result, Exception):
+                                console.print(f"[bold red]{label}Error executing command: {str(result)}[/bold red]")
+                                any_failed = True
+                            elif result == 0:
+                                console.print(f"[green]{label}Command executed successfully[/green]")
                             else:
-                                console.print(f"[bold red]Command failed with code {process.returncode}[/bold red]")
-                                console.print(f"Error: {process.stderr}")
-                                
-                                if not typer.confirm("Continue with next command?", default=True):
-                                    break
-                        except Exception as e:
-                            console.print(f"[bold red]Error executing command: {str(e)}[/bold red]")
-                            
-                            if not typer.confirm("Continue with next command?", default=True):
-                                break
+                                console.print(f"[bold red]{label}Command failed with code {result}[/bold red]")
+                                any_failed = True
+                        
+                        if any_failed and not typer.confirm("Continue with next command?", default=True):
+                            break
         
         # Install dependencies if requested
+        install_future = None
         if install:
             package_managers = {
                 "npm": ("package.json", "npm install"),
@@ -1353,19 +1966,21 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
                 "pub": ("pubspec.yaml", "flutter pub get")
             }
             
-            # Detect available package managers based on files
+            # Detect available package managers based on files, listing the directory once
+            top_level_names = _top_level_names(project_dir)
             available_package_managers = []
             for pm, (file_indicator, install_cmd) in package_managers.items():
                 if isinstance(file_indicator, list):
-                    if any(len(list(project_dir.glob(pattern))) > 0 for pattern in file_indicator):
+                    if any(fnmatch.filter(top_level_names, pattern) for pattern in file_indicator):
                         available_package_managers.append((pm, install_cmd))
-                elif (project_dir / file_indicator).exists():
+                elif file_indicator in top_level_names:
                     available_package_managers.append((pm, install_cmd))
             
             if available_package_managers:
-                console.print("\n[bold cyan]Available Package Managers:[/bold cyan]")
-                for i, (pm, cmd) in enumerate(available_package_managers):
-                    console.print(f"{i+1}. {pm} ({cmd})")
+                console.print("\n".join([
+                    "\n[bold cyan]Available Package Managers:[/bold cyan]",
+                    *(f"{i+1}. {pm} ({cmd})" for i, (pm, cmd) in enumerate(available_package_managers)),
+                ]))
                 
                 if len(available_package_managers) == 1:
                     pm_choice = 0
@@ -1380,42 +1995,23 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
                     pm, install_cmd = available_package_managers[pm_choice]
                     console.print(f"\n[bold green]Installing dependencies with {pm}...[/bold green]")
                     
-                    try:
-                        # For npm/yarn, check if we have additional detected dependencies
-                        if pm in ["npm", "yarn"] and extracted_dependencies:
-                            # Ask if user wants to install detected dependencies
-                            if typer.confirm(f"Install {len(extracted_dependencies)} detected dependencies?", default=True):
-                                dep_command = f"npm install --save {' '.join(extracted_dependencies)}" if pm == "npm" else f"yarn add {' '.join(extracted_dependencies)}"
-                                console.print(f"[bold green]Executing: {dep_command}[/bold green]")
-                                
-                                process = subprocess.run(
-                                    dep_command,
-                                    cwd=project_dir,
-                                    shell=True,
-                                    capture_output=True,
-                                    text=True
-                                )
-                                
-                                if process.returncode == 0:
-                                    console.print("[green]Dependencies installed successfully[/green]")
-                                else:
-                                    console.print(f"[bold red]Failed to install dependencies: {process.stderr}[/bold red]")
-                        
-                        # Run the main install command
-                        process = subprocess.run(
-                            install_cmd,
-                            cwd=project_dir,
-                            shell=True,
-                            capture_output=True,
-                            text=True
-                        )
-                        
-                        if process.returncode == 0:
-                            console.print("[green]Dependencies installed successfully[/green]")
-                        else:
-                            console.print(f"[bold red]Failed to install dependencies: {process.stderr}[/bold red]")
-                    except Exception as e:
-                        console.print(f"[bold red]Error installing dependencies: {str(e)}[/bold red]")
+                    install_commands = []
+                    # For npm/yarn, check if we have additional detected dependencies
+                    if pm in ["npm", "yarn"] and extracted_dependencies:
+                        # Ask if user wants to install detected dependencies
+                        if typer.confirm(f"Install {len(extracted_dependencies)} detected dependencies?", default=True):
+                            dep_command = f"npm install --save {' '.join(extracted_dependencies)}" if pm == "npm" else f"yarn add {' '.join(extracted_dependencies)}"
+                            console.print(f"[bold green]Executing: {dep_command}[/bold green]")
+                            install_commands.append(dep_command)
+                    
+                    # Then the main install command
+                    install_commands.append(install_cmd)
+                    
+                    # Install in the background so run command detection and its prompt don't wait on it;
+                    # the result is reported before the application starts
+                    install_executor = ThreadPoolExecutor(max_workers=1)
+                    install_future = install_executor.submit(_run_install_commands, install_commands, project_dir, command_env)
+                    install_executor.shutdown(wait=False)
             else:
                 console.print("\n[yellow]No package manager detected for this project type[/yellow]")
         
@@ -1438,18 +2034,18 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
             
             # Determine run command based on project type
             run_command = None
+            top_level_names = _top_level_names(project_dir)
             
             # Check if package.json has start script
             package_json_path = project_dir / "package.json"
-            if package_json_path.exists():
+            if "package.json" in top_level_names:
                 try:
-                    with open(package_json_path, "r") as f:
-                        package_data = json.load(f)
+                    package_data = _read_package_json(package_json_path)
                     
-                    if "scripts" in package_data and "start" in package_data["scripts"]:
-                        run_command = "npm start"
-                    elif "scripts" in package_data and "dev" in package_data["scripts"]:
-                        run_command = "npm run dev"
+                    scripts = package_data.get("scripts") or {}
+                    chosen_script = next((name for name in _RUN_SCRIPT_PRIORITY if name in scripts), None)
+                    if chosen_script:
+                        run_command = _RUN_SCRIPT_COMMANDS[chosen_script]
                 except Exception:
                     pass
             
@@ -1462,26 +2058,36 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
             
             # Common file-based detection as fallback
             if not run_command:
-                if (project_dir / "manage.py").exists():
-                    run_command = "python manage.py runserver"
-                elif (project_dir / "app.py").exists():
-                    run_command = "flask run"
-                elif list(project_dir.glob("*.csproj")):
+                sentinels = _find_project_sentinels(project_dir)
+                # Entry points in the project root come first; nested ones are a last resort,
+                # so a stray scripts/tools/app.py never wins over a top-level server.js
+                top_level_sentinels = {name: path for name, path in sentinels.items() if "/" not in path}
+                if "manage.py" in top_level_sentinels or "app.py" in top_level_sentinels:
+                    run_command = _sentinel_run_command(top_level_sentinels)
+                elif fnmatch.filter(top_level_names, "*.csproj"):
                     run_command = "dotnet run"
-                elif (project_dir / "app.js").exists() or (project_dir / "server.js").exists():
-                    run_command = "node app.js" if (project_dir / "app.js").exists() else "node server.js"
+                elif "app.js" in top_level_names or "server.js" in top_level_names:
+                    run_command = "node app.js" if "app.js" in top_level_names else "node server.js"
+                else:
+                    run_command = _sentinel_run_command(sentinels)
             
             if run_command:
                 console.print(f"\n[bold cyan]Run Command Detected: {run_command}[/bold cyan]")
                 
                 if typer.confirm("Run the application?", default=True):
+                    if install_future is not None:
+                        _report_install(install_future, console)
+                        install_future = None
+                    
                     console.print(f"\n[bold green]Executing: {run_command}[/bold green]")
                     try:
                         # For simplicity, we'll run this in a non-capturing way so the user sees the output directly
                         subprocess.run(
                             run_command,
                             cwd=project_dir,
-                            shell=True
+                            shell=True,
+                            close_fds=False,
+                            env=command_env
                         )
                     except KeyboardInterrupt:
                         console.print("\n[yellow]Application stopped by user[/yellow]")
@@ -1490,27 +2096,45 @@ def init(prompt: str, directory: str = None, install: bool = typer.Option(True,
             else:
                 console.print("\n[yellow]No run command detected for this project type[/yellow]")
         
+        if install_future is not None:
+            _report_install(install_future, console)
+        
         # Successful completion message with project path
         console.print(Panel.fit(
             f"Project successfully created at:\n[bold green]{project_dir}[/bold green]",
             title="Success",
             border_style="green"
         ))
-@app.command()
-@require_api_key
-def review(
-    threshold: int = typer.Option(5, "--threshold", "-t", help="Minimum severity score (1-10)"),
-    format: str = typer.Option("text", "--format", "-f", help="Output format: text, json, or markdown"),
-):
-    """Identify and quantify technical debt in the project"""
-    # Show a simple progress message
-    print("Analyzing codebase for technical debt...", flush=True)
-    
-    # Get codebase context
-    context = get_codebase_context()
+
+def _sample_context(context, max_chars):
+    """Pick a deterministic subset of the context that fits in max_chars.
+
+    Files are taken largest first, in turns across file extensions so no single language
+    crowds out the rest; files that no longer fit are skipped.
+    """
+    by_extension = {}
+    for path in sorted(context, key=lambda p: (-len(context[p]), p)):
+        by_extension.setdefault(os.path.splitext(path)[1], []).append(path)
     
-    # Improved prompt with clearer instructions
-    prompt = f"""
+    sampled = {}
+    remaining = max_chars
+    queues = [deque(by_extension[ext]) for ext in sorted(by_extension)]
+    while queues:
+        next_queues = []
+        for queue in queues:
+            # Take the largest file of this extension that still fits
+            while queue and len(context[queue[0]]) > remaining:
+                queue.popleft()
+            if queue:
+                path = queue.popleft()
+                sampled[path] = context[path]
+                remaining -= len(context[path])
+                next_queues.append(queue)
+        queues = next_queues
+    return sampled
+
+# Prompt for `review`, with clearer instructions; only {threshold} and {format} vary per call
+_REVIEW_PROMPT_TEMPLATE = """
     Analyze the codebase for technical debt. Identify issues like:
     
     1. Code duplication
@@ -1537,6 +2161,26 @@ def review(
     
     Return in {format} format with clear headings and structure.
     """
+
+@app.command()
+@require_api_key
+def review(
+    threshold: int = typer.Option(5, "--threshold", "-t", help="Minimum severity score (1-10)"),
+    format: str = typer.Option("text", "--format", "-f", help="Output format: text, json, or markdown"),
+):
+    """Identify and quantify technical debt in the project"""
+    # Show a simple progress message
+    print("Analyzing codebase for technical debt...", flush=True)
+    
+    # Get codebase context, sampled down if it is too large to send in full
+    context = _cached_context()
+    max_chars = load_config().get("review_max_context_chars", DEFAULT_CONFIG["review_max_context_chars"])
+    if sum(len(content) for content in context.values()) > max_chars:
+        sampled = _sample_context(context, max_chars)
+        print(f"Note: codebase is too large to review in full; analyzing {len(sampled)} of {len(context)} files.")
+        context = sampled
+    
+    prompt = _REVIEW_PROMPT_TEMPLATE.format(threshold=threshold, format=format)
     
     # Generate analysis
     try: